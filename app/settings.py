@@ -38,10 +38,24 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'projects.apps.ProjectsConfig',
     'rest_framework',
-    'drf_yasg',
 ]
 
+# OpenAPI schema (see projects/schema.py), written next to SCHEMA_FILE as
+# JSON and YAML by `manage.py build_schema` at deploy time. With LAZY_BUILD,
+# a worker builds it on the first request when the files are missing.
+# UI mounts /swagger/ and /redoc/; without it drf_yasg is never imported.
+
+API_DOCS = {
+    'SCHEMA_FILE': BASE_DIR / 'openapi.json',
+    'LAZY_BUILD': True,
+    'UI': True,
+}
+
+if API_DOCS['UI']:
+    INSTALLED_APPS.append('drf_yasg')
+
 MIDDLEWARE = [
+    'projects.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,11 +88,49 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# WAL lets readers run alongside the writer; IMMEDIATE transactions take the
+# write lock upfront instead of failing on upgrade. Connections are kept for
+# CONN_MAX_AGE seconds and checked before reuse.
+
+SQLITE_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA busy_timeout=5000;'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 5,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': SQLITE_OPTIONS,
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # File copy of the primary, refreshed by `python manage.py sync_replica`.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['projects.replicas.ReplicaRouter']
+
+# Aliases serving the safe requests of the project, issue and comment
+# endpoints (see projects/replicas.py); add 'replica' once it has been
+# synced. After a write, the user reads from the primary for STICKY_SECONDS.
+
+DATABASE_ROUTING = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': 5,
 }
 
 # Password validation
@@ -122,6 +174,33 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'projects.User'
 
+# Passwords are hashed and verified in a bounded pool (see projects/hashing.py).
+# The first hasher hashes new passwords; existing hashes made with another
+# hasher or other parameters are upgraded at the next login.
+
+AUTHENTICATION_BACKENDS = ['projects.hashing.PooledModelBackend']
+
+PASSWORD_HASHERS = [
+    'projects.hashing.PBKDF2PasswordHasher',
+    'projects.hashing.ScryptPasswordHasher',
+    'projects.hashing.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# EXECUTOR is 'thread' or 'process'. Beyond MAX_PENDING concurrent
+# hashing requests, callers wait QUEUE_TIMEOUT seconds, then get a 503.
+
+PASSWORD_HASHING = {
+    'EXECUTOR': 'thread',
+    'WORKERS': 4,
+    'MAX_PENDING': 64,
+    'QUEUE_TIMEOUT': 2,
+    'PBKDF2_ITERATIONS': 870000,
+    'SCRYPT_WORK_FACTOR': 2 ** 14,
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 102400,
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -131,13 +210,139 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'projects.authentication.StatelessJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 4
 }
 
+# Upper bound for client-chosen page sizes (?limit= and ?page_size=).
+
+MAX_PAGE_SIZE = 100
+
+# Maximum number of items accepted by the bulk write endpoints.
+
+BULK_MAX_ITEMS = 1000
+
+# Rows read per database round trip by the streaming project export.
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Cache backend used by the membership index and the response cache.
+# Swap for a shared backend (Redis, Memcached) in production.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'softdesk',
+    }
+}
+
+# Versioned cache of project and issue detail responses (see projects/cache.py).
+
+RESPONSE_CACHE = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 600,
+}
+
+# ETag / Last-Modified validators and 304 responses (see projects/conditional.py).
+
+CONDITIONAL_REQUESTS = {
+    'ENABLED': True,
+}
+
+# Per-request latency and query metrics, exposed at /metrics to
+# administrators and to the ALLOWED_IPS addresses (see projects/metrics.py).
+# Requests slower than SLOW_REQUEST_THRESHOLD seconds are logged with their
+# SLOW_QUERY_COUNT slowest queries.
+
+METRICS = {
+    'ENABLED': True,
+    'SLOW_REQUEST_THRESHOLD': 0.5,
+    'SLOW_QUERY_COUNT': 3,
+    'ALLOWED_IPS': [],
+}
+
+# Test runner (see projects/runner.py): silences the slow request log and
+# hashes test passwords with MD5.
+
+TEST_RUNNER = 'projects.runner.TestRunner'
+
+# Stateless JWT authentication (see projects/authentication.py): the
+# credentials version embedded in tokens is checked against this cache,
+# which the database only refills on a miss or after TIMEOUT seconds.
+
+STATELESS_AUTH = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# Delta sync (see projects/sync.py): changes returned per /api/v1/sync/
+# page, and days of change log kept by the prune_changes command.
+
+SYNC = {
+    'PAGE_SIZE': 500,
+    'RETENTION_DAYS': 30,
+}
+
+# Server-Sent Events streams (see projects/events.py). BROKER fans events
+# out to the streams; the default LocalBroker only reaches the streams of
+# its own process. Streams whose QUEUE_SIZE events are not consumed yet
+# catch up from the change log, REPLAY_PAGE_SIZE changes per query.
+
+EVENTS = {
+    'BROKER': 'projects.events.LocalBroker',
+    'QUEUE_SIZE': 100,
+    'HEARTBEAT_SECONDS': 15,
+    'REPLAY_PAGE_SIZE': 500,
+}
+
+# Activity feed (see projects/activity.py): entries are buffered in each
+# process and written with bulk_create every FLUSH_INTERVAL seconds, or as
+# soon as BATCH_SIZE entries wait. THREAD=False writes them from the
+# request once BATCH_SIZE is reached instead of from a background thread.
+
+ACTIVITY = {
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2,
+    'MAX_BUFFER': 10000,
+    'THREAD': True,
+}
+
+# Project deletion (see projects/purge.py): deleted projects are hidden at
+# once, then a background thread deletes their rows, CHUNK_SIZE per
+# transaction with PAUSE seconds between chunks. Run the purge_projects
+# command to finish purges interrupted by a restart.
+
+PURGE = {
+    'CHUNK_SIZE': 1000,
+    'PAUSE': 0.05,
+    'THREAD': True,
+}
+
+# Archival of finished issues (see projects/archive.py): the archive_issues
+# command moves the issues finished with no activity for AGE_DAYS days,
+# with their comments and assignments, to the archive tables, BATCH_SIZE
+# issues per transaction.
+
+ARCHIVE = {
+    'AGE_DAYS': 90,
+    'BATCH_SIZE': 500,
+}
+
+# Project membership index used by permissions and serializers
+# (see projects/membership.py). Set USE_DJANGO_CACHE to keep entries in
+# the configured CACHES backend instead of each worker's memory, so that
+# an invalidation reaches every worker.
+
+MEMBERSHIP_CACHE = {
+    'TIMEOUT': 300,
+    'MAX_ENTRIES': 10000,
+    'USE_DJANGO_CACHE': False,
+}
+
 
 ...
 
@@ -173,7 +378,7 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 
-    "TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainPairSerializer",
+    "TOKEN_OBTAIN_SERIALIZER": "projects.serializers.TokenObtainPairSerializer",
     "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
     "TOKEN_VERIFY_SERIALIZER": "rest_framework_simplejwt.serializers.TokenVerifySerializer",
     "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
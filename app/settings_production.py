@@ -0,0 +1,54 @@
+"""
+Production settings: the development settings without the apps, renderers
+and middleware that a JSON API worker does not need, so that workers boot
+and serve their first request sooner.
+
+Select them with DJANGO_SETTINGS_MODULE=app.settings_production, and
+compare with `python manage.py startup_profile --settings=app.settings_production`.
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import API_DOCS, INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK, SECRET_KEY, TEMPLATES
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost').split(',')
+
+# No admin, Swagger UI or ReDoc: the schema is still served at /openapi.json
+# from the files written by build_schema at deploy time.
+
+API_DOCS = {**API_DOCS, 'UI': False, 'LAZY_BUILD': False}
+
+UNUSED_APPS = {
+    'django.contrib.admin',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'drf_yasg',
+}
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in UNUSED_APPS]
+
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE
+              if middleware != 'django.contrib.messages.middleware.MessageMiddleware']
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'context_processors': [
+            processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+            if processor != 'django.contrib.messages.context_processors.messages'
+        ],
+    },
+}]
+
+# JSON only: the browsable API renderer loads templates and forms per request.
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+}
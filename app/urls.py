@@ -1,25 +1,32 @@
-from django.contrib import admin
+from django.apps import apps
+from django.conf import settings
 from django.urls import path, include
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
 from rest_framework import routers
 from rest_framework_nested import routers as nested_routers
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-    TokenVerifyView
-)
-
-from projects.views import *
+from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="SoftDesk API",
-        default_version='v1',
-        description="API for SoftDesk project",
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
+from projects.async_views import (
+    AsyncCommentListView,
+    AsyncEventStreamView,
+    AsyncIssueDetailView,
+    AsyncIssueEventStreamView,
+    AsyncIssueListView,
+    AsyncProjectDetailView,
+    AsyncProjectListView,
+    AsyncTokenObtainPairView,
+    AsyncUserRegistrationView
+)
+from projects.metrics import metrics_view
+from projects.schema import docs_view, schema_view
+from projects.views import (
+    CacheStatsView,
+    CommentViewSet,
+    IssueViewSet,
+    MyActivityView,
+    MyIssuesView,
+    ProjectViewSet,
+    SyncView,
+    UserProfileView
 )
 
 router = routers.SimpleRouter()
@@ -36,18 +43,52 @@ issues_router = nested_routers.NestedSimpleRouter(
 issues_router.register(r'comments', CommentViewSet, basename='issue-comments')
 
 urlpatterns = [
-    path('swagger/', schema_view.with_ui('swagger',
-                                         cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc',
-                                       cache_timeout=0), name='schema-redoc'),
-    path('admin/', admin.site.urls),
+    path('openapi.json', schema_view, {'fmt': 'json'}, name='schema-json'),
+    path('openapi.yaml', schema_view, {'fmt': 'yaml'}, name='schema-yaml'),
+    path('metrics', metrics_view, name='metrics'),
     path('api/v1/', include(router.urls)),
     path('api/v1/', include(projects_router.urls)),
     path('api/v1/', include(issues_router.urls)),
-    path('api/v1/register/', UserRegistrationView.as_view(), name='register'),
+    # Native async read endpoints, for workers running under ASGI
+    path('api/v1/async/projects/', AsyncProjectListView.as_view(), name='async-projects-list'),
+    path('api/v1/async/projects/<int:pk>/', AsyncProjectDetailView.as_view(),
+         name='async-projects-detail'),
+    path('api/v1/async/projects/<int:project_pk>/issues/', AsyncIssueListView.as_view(),
+         name='async-project-issues-list'),
+    path('api/v1/async/projects/<int:project_pk>/issues/<int:pk>/', AsyncIssueDetailView.as_view(),
+         name='async-project-issues-detail'),
+    path('api/v1/async/projects/<int:project_pk>/issues/<int:issue_pk>/comments/',
+         AsyncCommentListView.as_view(), name='async-issue-comments-list'),
+    # Server-Sent Events streams of issue and comment changes
+    path('api/v1/async/projects/<int:project_pk>/events/', AsyncEventStreamView.as_view(),
+         name='async-project-events'),
+    path('api/v1/async/projects/<int:project_pk>/issues/<int:issue_pk>/events/',
+         AsyncIssueEventStreamView.as_view(), name='async-issue-events'),
+    path('api/v1/register/', AsyncUserRegistrationView.as_view(), name='register'),
     path('api/v1/profile/', UserProfileView.as_view(), name='profile'),
-    path('api-auth/', include('rest_framework.urls')),
-    path('api/v1/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/v1/me/issues/', MyIssuesView.as_view(), name='me-issues'),
+    path('api/v1/me/activity/', MyActivityView.as_view(), name='me-activity'),
+    path('api/v1/sync/', SyncView.as_view(), name='sync'),
+    path('api/v1/cache/stats/', CacheStatsView.as_view(), name='cache_stats'),
+    path('api/v1/token/', AsyncTokenObtainPairView.as_view(),
+         name='token_obtain_pair'),
     path('api/v1/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/v1/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
 ]
+
+if settings.API_DOCS['UI']:
+    urlpatterns += [
+        path('swagger/', docs_view, {'renderer': 'swagger'}, name='schema-swagger-ui'),
+        path('redoc/', docs_view, {'renderer': 'redoc'}, name='schema-redoc'),
+    ]
+
+# Login pages of the browsable API.
+if 'rest_framework.renderers.BrowsableAPIRenderer' in settings.REST_FRAMEWORK[
+        'DEFAULT_RENDERER_CLASSES']:
+    urlpatterns.append(path('api-auth/', include('rest_framework.urls')))
+
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.append(path('admin/', admin.site.urls))
+
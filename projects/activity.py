@@ -0,0 +1,159 @@
+import atexit
+import logging
+import threading
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Activity
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2,
+    'MAX_BUFFER': 10000,
+    'THREAD': True,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'ACTIVITY', {}).get(name, DEFAULTS[name])
+
+
+# (id, username) of the user making the current request, set by ActivityMixin.
+current_actor = ContextVar('current_actor', default=None)
+
+
+class ActivityBuffer:
+    """
+    In-process buffer of activity entries, written with bulk_create by a
+    background thread every FLUSH_INTERVAL seconds, as soon as BATCH_SIZE
+    entries are waiting, and at interpreter exit.
+
+    Beyond MAX_BUFFER entries (the database being unreachable), the oldest
+    entries are dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._entries = []
+        self._thread = None
+        self.dropped = 0
+
+    def add(self, *entries):
+        full = self._extend(entries)
+        if not get_setting('THREAD'):
+            if full:
+                self.flush()
+            return
+        self._start_thread()
+        if full:
+            self._wakeup.set()
+
+    def _extend(self, entries, front=False):
+        with self._lock:
+            if front:
+                self._entries[:0] = entries
+            else:
+                self._entries.extend(entries)
+            overflow = len(self._entries) - get_setting('MAX_BUFFER')
+            if overflow > 0:
+                del self._entries[:overflow]
+                self.dropped += overflow
+                logger.warning("Activity buffer full, %d entries dropped.", overflow)
+            return len(self._entries) >= get_setting('BATCH_SIZE')
+
+    def _start_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            # Not alive either after a fork: each process runs its own flusher.
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='activity-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while get_setting('THREAD'):
+            self._wakeup.wait(get_setting('FLUSH_INTERVAL'))
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Activity flush failed.")
+
+    def flush(self):
+        """
+        Write the buffered entries. They go back to the buffer if the
+        database refuses them.
+        """
+        with self._flush_lock:
+            with self._lock:
+                entries, self._entries = self._entries, []
+            if not entries:
+                return 0
+            try:
+                Activity.objects.bulk_create(entries, batch_size=get_setting('BATCH_SIZE'))
+            except DatabaseError:
+                self._extend(entries, front=True)
+                raise
+            return len(entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+activity_buffer = ActivityBuffer()
+
+
+@atexit.register
+def flush_at_exit():
+    try:
+        activity_buffer.flush()
+    except Exception:
+        logger.exception("Activity entries lost at exit.")
+
+
+def entry(project_id, verb, target_model, target_id, target_name=''):
+    actor_id, actor_username = current_actor.get() or (None, '')
+    return Activity(project_id=project_id, actor_id=actor_id, actor_username=actor_username,
+                    verb=verb, target_model=target_model, target_id=target_id,
+                    target_name=target_name[:255], time=timezone.now())
+
+
+def record(*entries):
+    """
+    Buffer entries once the current transaction commits.
+    """
+    if entries:
+        transaction.on_commit(lambda: activity_buffer.add(*entries))
+
+
+class ActivityMixin:
+    """
+    Make the request's user the actor of the activity entries recorded
+    while the view runs.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user = request.user
+        if user.is_authenticated:
+            self._actor_token = current_actor.set((user.pk, user.username))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_actor_token', None)
+        if token is not None:
+            current_actor.reset(token)
+            self._actor_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projects'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .metrics import get_setting, install_execute_wrapper
+        from django.db.backends.signals import connection_created
+
+        if get_setting('ENABLED'):
+            connection_created.connect(install_execute_wrapper)
@@ -0,0 +1,124 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import sync
+from .cache import response_cache
+from .models import (
+    ArchivedAssignment, ArchivedComment, ArchivedIssue, Change, Comment, Issue, Project)
+from .purge import delete_rows
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'AGE_DAYS': 90,
+    'BATCH_SIZE': 500,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'ARCHIVE', {}).get(name, DEFAULTS[name])
+
+
+# (hot model, archive model, column holding the issue id, whether ids are
+# kept), parents first. Assignments get new ids in the other table.
+TABLES = [
+    (Issue, ArchivedIssue, 'id', True),
+    (Comment, ArchivedComment, 'issue_id', True),
+    (Issue.assigned_users.through, ArchivedAssignment, 'issue_id', False),
+]
+
+
+def include_archived(request):
+    """
+    Whether a read asks for archived issues too, with ?include_archived=1.
+    """
+    return (request.method in ('GET', 'HEAD', 'OPTIONS') and
+            request.query_params.get('include_archived') in ('1', 'true'))
+
+
+def copy_rows(source, target, column, ids, keep_ids=True):
+    """
+    INSERT ... SELECT of the rows whose column is in ids, values unchanged.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in source._meta.concrete_fields
+                        if keep_ids or not field.primary_key)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {quote(target._meta.db_table)} ({columns}) "
+                       f"SELECT {columns} FROM {quote(source._meta.db_table)} "
+                       f"WHERE {quote(column)} IN ({placeholders})", ids)
+        return cursor.rowcount
+
+
+def move(ids, to_archive=True, **conditions):
+    """
+    Move issues with their comments and assignments between the hot and
+    archive tables in one transaction, skipping those that no longer match
+    conditions. Returns the number of issues moved.
+
+    Restored issues count as active again, so that archive() does not take
+    them back at once. The change log gets a tombstone for each archived
+    issue, which leaves the hot views, and an update for each restored one.
+    """
+    tables = [(hot, cold, column, keep_ids) if to_archive else (cold, hot, column, keep_ids)
+              for hot, cold, column, keep_ids in TABLES]
+    issue_model = tables[0][0]
+    with transaction.atomic():
+        # Locked, so that no comment lands on an issue being moved.
+        rows = list(issue_model.objects.select_for_update().filter(id__in=ids, **conditions)
+                    .values_list('id', 'project_id'))
+        if not rows:
+            return 0
+        ids = [issue_id for issue_id, _ in rows]
+        project_ids = {project_id for _, project_id in rows}
+        for source, target, column, keep_ids in tables:
+            copy_rows(source, target, column, ids, keep_ids)
+        for source, target, column, keep_ids in reversed(tables):
+            delete_rows(source, ids, column)
+        if not to_archive:
+            Issue.objects.filter(id__in=ids).touch(last_activity_time=timezone.now())
+        action = Change.DELETE if to_archive else Change.UPDATE
+        sync.record(*(sync.entry('issue', issue_id, project_id, action)
+                      for issue_id, project_id in rows))
+        # Project details list the hot issues.
+        Project.objects.filter(id__in=project_ids).touch()
+    response_cache.bump('issue', *ids)
+    response_cache.bump('project', *project_ids)
+    return len(ids)
+
+
+def archive(age_days=None, batch_size=None, progress=None):
+    """
+    Move the issues finished with no activity for AGE_DAYS days to the
+    archive tables, BATCH_SIZE issues per transaction. progress(moved) is
+    called after each batch. Returns the number of issues archived.
+    """
+    age_days = get_setting('AGE_DAYS') if age_days is None else age_days
+    batch_size = batch_size or get_setting('BATCH_SIZE')
+    cutoff = timezone.now() - timedelta(days=age_days)
+    conditions = {'status': 'Finished', 'last_activity_time__lt': cutoff}
+    candidates = Issue.objects.filter(**conditions)
+    archived = 0
+    while True:
+        ids = list(candidates.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        archived += move(ids, **conditions)
+        logger.info("%d issues archived.", archived)
+        if progress is not None:
+            progress(archived)
+        if len(ids) < batch_size:
+            break
+    return archived
+
+
+def restore(ids):
+    """
+    Move archived issues back to the hot tables.
+    """
+    return move(ids, to_archive=False)
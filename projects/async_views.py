@@ -0,0 +1,374 @@
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, update_last_login
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import (
+    APIException, AuthenticationFailed, NotAuthenticated, NotFound, ParseError,
+    PermissionDenied, ValidationError)
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import events, sync
+from .authentication import StatelessJWTAuthentication
+from .hashing import aauthenticate
+from .membership import ais_contributor, to_pk
+from .metrics import serializer_data
+from .models import Comment, Issue, Project
+from .permissions import IsContributor, IsOwnerOrReadOnly
+from .serializers import (
+    CommentSerializer, IssueSerializer, ProjectSerializer, TokenObtainPairSerializer,
+    UserRegistrationSerializer)
+from .views import age_error
+
+
+class AsyncAPIView(View):
+    """
+    Base of the native async views: JWT authentication and DRF exceptions
+    rendered as JSON, like APIView.
+    """
+    authentication_class = StatelessJWTAuthentication
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Requests are authenticated by token, not by session: no CSRF check.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def handle_exception(self, exc):
+        detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+        response = self.render(detail, status=exc.status_code)
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = '%d' % exc.wait
+        return response
+
+    async def aauthenticate(self, request):
+        request.user = AnonymousUser()
+        return await self.authentication_class().aauthenticate(request)
+
+    def parse(self, request):
+        """
+        Request body as a dict, from JSON or form data.
+        """
+        if request.content_type != 'application/json':
+            return request.POST
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError as exc:
+            raise ParseError(f"JSON invalide : {exc}")
+        if not isinstance(data, dict):
+            raise ParseError("Un objet JSON est attendu.")
+        return data
+
+    def render(self, data, status=200):
+        return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder,
+                            json_dumps_params={'ensure_ascii': False})
+
+
+class AsyncReadView(AsyncAPIView):
+    """
+    Native async read-only view, for serving reads under ASGI without a
+    thread hop per request. Mirrors the DRF viewsets' responses, with JWT
+    authentication and limit/offset pagination.
+
+    Subclasses define aget(request, **kwargs), returning the response data,
+    or override get() itself.
+    """
+    permission_classes = []
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            await self.ainitial(request)
+            data = await self.aget(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(exc)
+        return self.render(data)
+
+    async def ainitial(self, request):
+        result = await self.aauthenticate(request)
+        if result is None:
+            raise NotAuthenticated()
+        request.user, request.auth = result
+        for permission in self.permission_classes:
+            check = getattr(permission(), 'ahas_permission', None)
+            if check is not None:
+                await check(request, self)
+
+    async def acheck_object_permissions(self, request, obj):
+        for permission in self.permission_classes:
+            check = getattr(permission(), 'ahas_object_permission', None)
+            if check is not None and not await check(request, self, obj):
+                raise PermissionDenied()
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['context'] = {'request': self.request, 'view': self}
+        return self.serializer_class(*args, **kwargs)
+
+    async def apaginate(self, request, queryset):
+        """
+        Same response shape as LimitOffsetPagination.
+        """
+        try:
+            limit = min(int(request.GET['limit']), settings.MAX_PAGE_SIZE)
+            if limit <= 0:
+                raise ValueError
+        except (KeyError, ValueError):
+            limit = settings.REST_FRAMEWORK['PAGE_SIZE']
+        try:
+            offset = max(int(request.GET['offset']), 0)
+        except (KeyError, ValueError):
+            offset = 0
+
+        count = await queryset.acount()
+        results = [obj async for obj in
+                   queryset[offset:offset + limit].aiterator(chunk_size=limit)]
+
+        url = request.build_absolute_uri()
+        next_url = previous_url = None
+        if offset + limit < count:
+            next_url = replace_query_param(
+                replace_query_param(url, 'limit', limit), 'offset', offset + limit)
+        if offset > 0:
+            previous_url = replace_query_param(url, 'limit', limit)
+            if offset - limit > 0:
+                previous_url = replace_query_param(previous_url, 'offset', offset - limit)
+            else:
+                previous_url = remove_query_param(previous_url, 'offset')
+
+        return {
+            'count': count,
+            'next': next_url,
+            'previous': previous_url,
+            'results': serializer_data(self.get_serializer(results, many=True)),
+        }
+
+
+class AsyncUserRegistrationView(AsyncAPIView):
+    """
+    User registration. The password is hashed in the hashing pool while
+    the worker serves other requests.
+    """
+
+    async def post(self, request):
+        try:
+            if await self.aauthenticate(request) is not None:
+                return self.render({"error": "Vous êtes déjà inscrit."}, status=400)
+            data = self.parse(request)
+            error = age_error(data)
+            if error:
+                return self.render({"error": error}, status=400)
+            serializer = UserRegistrationSerializer(data=data)
+            if not await sync_to_async(serializer.is_valid)():
+                return self.render(serializer.errors, status=400)
+            await serializer.asave()
+        except APIException as exc:
+            return self.handle_exception(exc)
+        return self.render({"message": "Utilisateur enregistré avec succès."}, status=201)
+
+
+class AsyncTokenObtainPairView(AsyncAPIView):
+    """
+    Same as simplejwt's TokenObtainPairView, awaiting the password
+    verification in the hashing pool instead of blocking on it.
+    """
+    serializer_class = TokenObtainPairSerializer
+
+    async def post(self, request):
+        try:
+            serializer = self.serializer_class(context={'request': request})
+            # Field checks only: validate() would authenticate synchronously.
+            credentials = serializer.to_internal_value(self.parse(request))
+            user = await aauthenticate(request, **credentials)
+            if not jwt_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(
+                    serializer.error_messages['no_active_account'], 'no_active_account')
+            refresh = serializer.get_token(user)
+            if jwt_settings.UPDATE_LAST_LOGIN:
+                await sync_to_async(update_last_login)(None, user)
+        except APIException as exc:
+            return self.handle_exception(exc)
+        return self.render({'refresh': str(refresh), 'access': str(refresh.access_token)})
+
+
+class AsyncProjectListView(AsyncReadView):
+    """
+    Async variant of ProjectViewSet.list.
+    """
+    serializer_class = ProjectSerializer
+
+    async def aget(self, request):
+        projects = (Project.alive.filter(contributor__user_id=request.user.pk)
+                    .order_by('created_time', 'id').with_details())
+        if not await projects.aexists():
+            raise NotFound("Aucun projet trouvé pour cet utilisateur.")
+        return await self.apaginate(request, projects)
+
+
+class AsyncProjectDetailView(AsyncReadView):
+    """
+    Async variant of ProjectViewSet.retrieve.
+    """
+    serializer_class = ProjectSerializer
+
+    async def aget(self, request, pk):
+        if not await ais_contributor(request.user, pk):
+            if not await Project.alive.filter(id=pk).aexists():
+                raise NotFound("Projet non trouvé.")
+            raise PermissionDenied(
+                "Vous n'êtes pas contributeur de ce projet.")
+        project = await Project.alive.with_details().filter(id=pk).afirst()
+        if project is None:
+            raise NotFound("Projet non trouvé.")
+        return serializer_data(self.get_serializer(project))
+
+
+class AsyncIssueListView(AsyncReadView):
+    """
+    Async variant of IssueViewSet.list.
+    """
+    serializer_class = IssueSerializer
+    permission_classes = [IsOwnerOrReadOnly, IsContributor]
+
+    async def aget(self, request, project_pk):
+        issues = (Issue.objects.filter(project_id=project_pk)
+                  .order_by('created_time', 'id').with_details())
+        if not await issues.aexists():
+            raise NotFound("Aucun problème trouvé pour ce projet.")
+        return await self.apaginate(request, issues)
+
+
+class AsyncIssueDetailView(AsyncReadView):
+    """
+    Async variant of IssueViewSet.retrieve.
+    """
+    serializer_class = IssueSerializer
+    permission_classes = [IsOwnerOrReadOnly, IsContributor]
+
+    async def aget(self, request, project_pk, pk):
+        issue = await (Issue.objects.filter(project_id=project_pk, id=pk)
+                       .with_details().afirst())
+        if issue is None:
+            raise NotFound()
+        await self.acheck_object_permissions(request, issue)
+        return serializer_data(self.get_serializer(issue))
+
+
+class AsyncCommentListView(AsyncReadView):
+    """
+    Async variant of CommentViewSet.list.
+    """
+    serializer_class = CommentSerializer
+    permission_classes = [IsOwnerOrReadOnly, IsContributor]
+
+    async def aget(self, request, project_pk, issue_pk):
+        if not await Issue.objects.filter(id=issue_pk, project_id=project_pk).aexists():
+            raise NotFound()
+        comments = Comment.objects.filter(issue_id=issue_pk).order_by('created_time', 'id')
+        if not await comments.aexists():
+            raise NotFound("Aucun commentaire trouvé pour ce problème.")
+        return await self.apaginate(request, comments)
+
+
+class AsyncEventStreamView(AsyncReadView):
+    """
+    Server-Sent Events stream of the issue and comment changes of a
+    project, for its contributors. Event ids are change log ids: a client
+    reconnecting with Last-Event-ID first gets the events it missed.
+    """
+    permission_classes = [IsContributor]
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            await self.ainitial(request)
+            filters = await self.aget_filters(**kwargs)
+            since = self.get_last_event_id(request)
+            if since is None:
+                since = await sync_to_async(sync.head)()
+        except APIException as exc:
+            return self.handle_exception(exc)
+        response = StreamingHttpResponse(self.stream(request, filters, since),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Ask proxies such as nginx not to buffer the stream.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def aget_filters(self, project_pk):
+        return {'project_id': project_pk}
+
+    def get_channel(self, filters):
+        if 'issue_id' in filters:
+            return events.issue_channel(filters['issue_id'])
+        return events.project_channel(filters['project_id'])
+
+    def get_last_event_id(self, request):
+        value = request.headers.get('Last-Event-ID', request.GET.get('last_event_id'))
+        if value is None:
+            return None
+        since = to_pk(value)
+        if since is None or since < 0:
+            raise ValidationError({"Last-Event-ID": "Identifiant d'événement invalide."})
+        return since
+
+    async def stream(self, request, filters, since):
+        """
+        Membership is checked again at least once per heartbeat, even while
+        events keep coming, so that a removed contributor's stream ends
+        before it yields anything else.
+        """
+        subscription = events.get_broker().subscribe(self.get_channel(filters))
+        heartbeat = events.get_setting('HEARTBEAT_SECONDS')
+        page_size = events.get_setting('REPLAY_PAGE_SIZE')
+        catching_up = True
+        checked = time.monotonic()
+
+        async def still_contributor():
+            nonlocal checked
+            if time.monotonic() - checked < heartbeat:
+                return True
+            checked = time.monotonic()
+            return await ais_contributor(request.user, self.kwargs['project_pk'])
+
+        try:
+            while True:
+                if catching_up or subscription.overflowed:
+                    if not await still_contributor():
+                        return
+                    # Events published from now on are also in the log.
+                    subscription.drain()
+                    try:
+                        await sync_to_async(sync.check_since)(since)
+                    except sync.ExpiredToken:
+                        since = await sync_to_async(sync.head)()
+                        yield f"id: {since}\nevent: reset\ndata: {{}}\n\n"
+                    missed, since, catching_up = await sync_to_async(sync.replay)(
+                        since, page_size, **filters)
+                    for event in missed:
+                        yield events.format_event(event)
+                    continue
+
+                event = await subscription.get(heartbeat)
+                if not await still_contributor():
+                    return
+                if event is None:
+                    yield ": heartbeat\n\n"
+                elif event['id'] > since:
+                    since = event['id']
+                    yield events.format_event(event)
+        finally:
+            subscription.close()
+
+
+class AsyncIssueEventStreamView(AsyncEventStreamView):
+    """
+    Server-Sent Events stream of the changes of an issue and its comments.
+    """
+
+    async def aget_filters(self, project_pk, issue_pk):
+        if not await Issue.objects.filter(id=issue_pk, project_id=project_pk).aexists():
+            raise NotFound()
+        return {'issue_id': to_pk(issue_pk)}
@@ -0,0 +1,188 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication with a native async entry point for the async views.
+    Token validation is pure CPU; only the user lookup goes through the async ORM.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = await self.user_model.objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}).afirst()
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+    'VERSION_CLAIM': 'auth_version',
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'STATELESS_AUTH', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[get_setting('CACHE_ALIAS')]
+
+
+def version_key(user_id):
+    return f'auth-version:{user_id}'
+
+
+def compute_auth_version(password, is_active):
+    """
+    Changes whenever the password changes; empty for inactive users.
+    """
+    if not is_active:
+        return ''
+    return hashlib.md5(password.encode()).hexdigest()[:16]
+
+
+def set_auth_version(user):
+    get_cache().set(version_key(user.pk),
+                    compute_auth_version(user.password, user.is_active),
+                    get_setting('TIMEOUT'))
+
+
+def forget_auth_version(user_id):
+    get_cache().delete(version_key(user_id))
+
+
+def get_auth_version(user_id):
+    """
+    Current version of the user's credentials, or None if the user does not exist.
+    Served from the cache; the database is only read on a miss.
+    """
+    version = get_cache().get(version_key(user_id))
+    if version is None:
+        row = User.objects.filter(pk=user_id).values_list('password', 'is_active').first()
+        if row is None:
+            return None
+        version = compute_auth_version(*row)
+        get_cache().set(version_key(user_id), version, get_setting('TIMEOUT'))
+    return version
+
+
+async def aget_auth_version(user_id):
+    version = await get_cache().aget(version_key(user_id))
+    if version is None:
+        row = await User.objects.filter(pk=user_id).values_list(
+            'password', 'is_active').afirst()
+        if row is None:
+            return None
+        version = compute_auth_version(*row)
+        await get_cache().aset(version_key(user_id), version, get_setting('TIMEOUT'))
+    return version
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    request.user built from the token claims. id, username and the
+    authentication flags are answered without a query; any other attribute,
+    or using it as a model instance, loads the User row once.
+    """
+
+    def __init__(self, user_id, username):
+        super().__init__(lambda: User.objects.get(pk=user_id))
+        self.__dict__['_user_id'] = user_id
+        self.__dict__['_username'] = username
+
+    @property
+    def pk(self):
+        return self.__dict__['_user_id']
+
+    id = pk
+
+    @property
+    def username(self):
+        return self.__dict__['_username']
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+
+class StatelessJWTAuthentication(AsyncJWTAuthentication):
+    """
+    Trust the signed claims instead of loading the user on every request.
+    Revocation goes through the credentials version embedded in the token,
+    checked against the cache. Tokens issued without it fall back to the
+    regular database lookup.
+    """
+
+    def get_user(self, validated_token):
+        claim = get_setting('VERSION_CLAIM')
+        if claim not in validated_token:
+            return super().get_user(validated_token)
+        user_id = self.get_user_id(validated_token)
+        self.check_version(validated_token[claim], get_auth_version(user_id))
+        return ClaimsUser(user_id, validated_token.get('username'))
+
+    async def aget_user(self, validated_token):
+        claim = get_setting('VERSION_CLAIM')
+        if claim not in validated_token:
+            return await super().aget_user(validated_token)
+        user_id = self.get_user_id(validated_token)
+        self.check_version(validated_token[claim], await aget_auth_version(user_id))
+        return ClaimsUser(user_id, validated_token.get('username'))
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def check_version(self, token_version, current_version):
+        if current_version is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if current_version == '':
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if token_version != current_version:
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed")
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from .metrics import serializer_data
+from .replicas import read_alias
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 600,
+    'KEY_PREFIX': 'response',
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'RESPONSE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[get_setting('CACHE_ALIAS')]
+
+
+class ResponseCache:
+    """
+    Serialized detail responses keyed by (resource, id, version, variant).
+
+    Every resource has a version counter in the cache, bumped by the signal
+    handlers in signals.py whenever something the response embeds changes,
+    so stale entries are simply never read again and expire on their own.
+    Bumps wait for the writing transaction to commit.
+    """
+
+    def __init__(self):
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    def _version_key(self, resource, pk):
+        return f"{get_setting('KEY_PREFIX')}:version:{resource}:{pk}"
+
+    def _new_version(self):
+        # Not 1: a version key evicted from the cache must not come back
+        # with a number some still-cached response was stored under.
+        return time.time_ns()
+
+    def get_version(self, resource, pk):
+        cache = get_cache()
+        key = self._version_key(resource, pk)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, self._new_version(), None)
+            version = cache.get(key)
+        return version
+
+    def bump(self, resource, *pks):
+        """
+        Bump the versions once the current transaction commits: a response
+        computed in the meantime reads the old rows, and would be stored
+        under the new version if it were bumped right away.
+        """
+        transaction.on_commit(lambda: self._bump(resource, pks))
+
+    def _bump(self, resource, pks):
+        cache = get_cache()
+        for pk in pks:
+            key = self._version_key(resource, pk)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, self._new_version(), None)
+
+    def _key(self, resource, pk, version, variant):
+        return f"{get_setting('KEY_PREFIX')}:{resource}:{pk}:{version}:{variant}"
+
+    def _count(self, resource, outcome):
+        with self._lock:
+            self.stats[f'{resource}.{outcome}'] += 1
+
+    def get_or_set(self, resource, pk, variant, compute, store=True):
+        """
+        Return the cached data, or compute() it and store it unless store is false.
+        """
+        if not get_setting('ENABLED'):
+            return compute()
+        version = self.get_version(resource, pk)
+        key = self._key(resource, pk, version, variant)
+        cache = get_cache()
+        data = cache.get(key)
+        if data is not None:
+            self._count(resource, 'hit')
+            return data
+        self._count(resource, 'miss')
+        data = compute()
+        if store:
+            cache.set(key, data, get_setting('TIMEOUT'))
+        return data
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+response_cache = ResponseCache()
+
+
+class CachedRetrieveMixin:
+    """
+    Serve retrieve() from the versioned response cache.
+    Permission checks still run on every request; only the object lookup
+    and serialization are skipped on a hit. Responses read from a replica
+    are not stored: the replica may lag behind the write that bumped the
+    version, and its stale data would be cached as the new version.
+    """
+    cache_resource = None
+
+    def check_cached_access(self):
+        """
+        Hook for access checks otherwise done in get_object(), which a hit skips.
+        """
+
+    def get_cache_variant(self):
+        # URL kwargs are part of the variant so that an object is only
+        # served under the parent it was looked up with.
+        kwargs = ':'.join(f'{key}={value}' for key, value in sorted(self.kwargs.items()))
+        return f'{self.get_serializer_class().__name__}:{kwargs}'
+
+    def retrieve(self, request, *args, **kwargs):
+        self.check_cached_access()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+
+        def compute():
+            instance = self.get_object()
+            return serializer_data(self.get_serializer(instance))
+
+        data = response_cache.get_or_set(
+            self.cache_resource, self.kwargs[lookup_url_kwarg],
+            self.get_cache_variant(), compute, store=read_alias.get() is None)
+        return Response(data)
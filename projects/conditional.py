@@ -0,0 +1,99 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .metrics import serializer_data
+
+DEFAULTS = {
+    'ENABLED': True,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'CONDITIONAL_REQUESTS', {}).get(name, DEFAULTS[name])
+
+
+class ConditionalGetMixin:
+    """
+    Answer If-None-Match / If-Modified-Since on list and retrieve with 304,
+    using a validator computed before any serialization:
+    max(updated_time) and row count for lists, updated_time for details.
+
+    Lists only get an ETag: deleting a row does not move max(updated_time),
+    so a Last-Modified date would let If-Modified-Since miss deletions.
+
+    Parents are bumped when their children change (see signals.py), so the
+    validator of an issue covers its comments and assignees.
+    """
+
+    def get_list_validator(self, queryset):
+        validator = queryset.prefetch_related(None).aggregate(
+            last_modified=Max('updated_time'), count=Count('id', distinct=True))
+        return validator['last_modified'], validator['count']
+
+    def get_detail_validator(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        last_modified = (self.get_queryset().prefetch_related(None)
+                         .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+                         .values_list('updated_time', flat=True).first())
+        if last_modified is None:
+            return None
+        return last_modified, 1
+
+    def get_validator_headers(self, validator, dated=True):
+        last_modified, count = validator
+        key = '|'.join(str(part) for part in (
+            self.__class__.__name__, self.action, self.request.user.pk,
+            self.request.get_full_path(), last_modified, count))
+        headers = {'ETag': f'W/"{hashlib.md5(key.encode()).hexdigest()}"'}
+        if dated and last_modified is not None:
+            headers['Last-Modified'] = http_date(last_modified.timestamp())
+        return headers
+
+    def conditional_response(self, validator, view, request, *args, dated=True, **kwargs):
+        """
+        Return a 304 when the client's copy is current, else the view's
+        response with ETag and, if dated, Last-Modified headers.
+        """
+        if validator is None:
+            return view(request, *args, **kwargs)
+
+        headers = self.get_validator_headers(validator, dated)
+        last_modified = validator[0].timestamp() if dated and validator[0] else None
+        not_modified = get_conditional_response(
+            request._request, etag=headers['ETag'], last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            for header, value in headers.items():
+                response[header] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        # Same as ListModelMixin.list, with the filtered queryset shared
+        # between the validator and the page so get_queryset() runs once.
+        queryset = self.filter_queryset(self.get_queryset())
+
+        def render(request, *args, **kwargs):
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(self.get_list_data(page))
+            return Response(self.get_list_data(queryset))
+
+        validator = self.get_list_validator(queryset) if get_setting('ENABLED') else None
+        return self.conditional_response(
+            validator, render, request, *args, dated=False, **kwargs)
+
+    def get_list_data(self, objects):
+        return serializer_data(self.get_serializer(objects, many=True))
+
+    def retrieve(self, request, *args, **kwargs):
+        validator = self.get_detail_validator() if get_setting('ENABLED') else None
+        return self.conditional_response(
+            validator, super().retrieve, request, *args, **kwargs)
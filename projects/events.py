@@ -0,0 +1,151 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+DEFAULTS = {
+    'BROKER': 'projects.events.LocalBroker',
+    'QUEUE_SIZE': 100,
+    'HEARTBEAT_SECONDS': 15,
+    'REPLAY_PAGE_SIZE': 500,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'EVENTS', {}).get(name, DEFAULTS[name])
+
+
+def project_channel(project_id):
+    return f'project:{project_id}'
+
+
+def issue_channel(issue_id):
+    return f'issue:{issue_id}'
+
+
+class Subscription:
+    """
+    Bounded queue of the events of a channel, consumed by one stream on
+    the event loop that created it. Publishers may run in any thread.
+
+    When the queue is full, new events are dropped and overflowed is set:
+    the stream then replays what it missed from the change log.
+    """
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop is closed: the stream is gone.
+            self.close()
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def drain(self):
+        """
+        Empty the queue after an overflow, before replaying from the log.
+        """
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed = False
+
+    async def get(self, timeout):
+        """
+        Next event, or None after timeout seconds without one.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    Interface of the event brokers. Events are JSON-serializable dicts
+    with an increasing 'id', published to named channels.
+
+    A broker shared between processes (Redis pub/sub, PostgreSQL
+    LISTEN/NOTIFY...) implements publish() by sending the event to the
+    other processes, and delivers what they send to its local subscriptions.
+    """
+
+    def publish(self, channel, event):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+    def has_subscribers(self, channel):
+        """
+        Whether publishing to the channel may reach a subscriber, so that
+        publishers can skip building events nobody listens to.
+        """
+        return True
+
+
+class LocalBroker(Broker):
+    """
+    In-process fan-out: events reach the streams of this process only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, get_setting('QUEUE_SIZE'))
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def has_subscribers(self, channel):
+        return channel in self._subscriptions
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(get_setting('BROKER'))()
+
+
+def format_event(event):
+    """
+    Server-Sent Events frame of an event.
+    """
+    data = json.dumps(event['data'], cls=JSONEncoder, ensure_ascii=False)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
@@ -0,0 +1,81 @@
+import json
+from itertools import islice
+
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import (
+    ArchivedAssignment, ArchivedComment, ArchivedIssue, Comment, Contributor, Issue)
+from .serializers import CommentSerializer, IssueSerializer, ProjectSerializer
+
+
+def export_fields(serializer_class):
+    """
+    Readable fields of a serializer that map to a concrete column, so that
+    rows can be read with values() and rendered without model instances.
+    """
+    model = serializer_class.Meta.model
+    columns = {field.name for field in model._meta.concrete_fields}
+    return {name: field for name, field in serializer_class().fields.items()
+            if not field.write_only and name in columns}
+
+
+def render(fields, row):
+    return {name: field.to_representation(row[name])
+            if row[name] is not None else None
+            for name, field in fields.items()}
+
+
+def line(record_type, data):
+    return json.dumps({'type': record_type, 'data': data},
+                      cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def export_project(project):
+    """
+    Yield a project, its contributors, issues (with assignees) and comments
+    as NDJSON lines, reading rows in chunks so memory stays flat.
+    """
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+
+    project_fields = export_fields(ProjectSerializer)
+    yield line('project', {name: field.to_representation(getattr(project, name))
+                           for name, field in project_fields.items()})
+
+    contributors = (Contributor.objects.filter(project=project)
+                    .order_by('id')
+                    .values('user_id', 'user__username', 'role'))
+    for contributor in contributors.iterator(chunk_size=chunk_size):
+        yield line('contributor', {'user_id': contributor['user_id'],
+                                   'username': contributor['user__username'],
+                                   'role': contributor['role']})
+
+    issue_fields = export_fields(IssueSerializer)
+    comment_fields = export_fields(CommentSerializer)
+    # Hot issues then archived ones, flagged with 'archived'.
+    tables = ((Issue, Comment, Issue.assigned_users.through),
+              (ArchivedIssue, ArchivedComment, ArchivedAssignment))
+    for issue_model, _, assignment_model in tables:
+        issues = (issue_model.objects.filter(project=project)
+                  .order_by('id')
+                  .values(*issue_fields).iterator(chunk_size=chunk_size))
+        while chunk := list(islice(issues, chunk_size)):
+            assignments = {}
+            for issue_id, user_id in (assignment_model.objects
+                                      .filter(issue_id__in=[issue['id'] for issue in chunk])
+                                      .values_list('issue_id', 'user_id')):
+                assignments.setdefault(issue_id, []).append(user_id)
+            for issue in chunk:
+                data = render(issue_fields, issue)
+                data['assigned_users'] = assignments.get(issue['id'], [])
+                data['archived'] = issue_model is ArchivedIssue
+                yield line('issue', data)
+
+    for _, comment_model, _ in tables:
+        comments = (comment_model.objects.filter(issue__project=project)
+                    .order_by('issue_id', 'id')
+                    .values('issue_id', *comment_fields))
+        for comment in comments.iterator(chunk_size=chunk_size):
+            data = render(comment_fields, comment)
+            data['issue'] = comment['issue_id']
+            yield line('comment', data)
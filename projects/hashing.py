@@ -0,0 +1,246 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_backends, get_user_model, hashers
+from django.contrib.auth.backends import ModelBackend
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DEFAULTS = {
+    'EXECUTOR': 'thread',
+    'WORKERS': os.cpu_count() or 1,
+    'MAX_PENDING': 64,
+    'QUEUE_TIMEOUT': 2,
+    'PBKDF2_ITERATIONS': hashers.PBKDF2PasswordHasher.iterations,
+    'SCRYPT_WORK_FACTOR': hashers.ScryptPasswordHasher.work_factor,
+    'SCRYPT_BLOCK_SIZE': hashers.ScryptPasswordHasher.block_size,
+    'SCRYPT_PARALLELISM': hashers.ScryptPasswordHasher.parallelism,
+    'ARGON2_TIME_COST': hashers.Argon2PasswordHasher.time_cost,
+    'ARGON2_MEMORY_COST': hashers.Argon2PasswordHasher.memory_cost,
+    'ARGON2_PARALLELISM': hashers.Argon2PasswordHasher.parallelism,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(name, DEFAULTS[name])
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2 with its iteration count taken from PASSWORD_HASHING.
+    Hashes made with another count are upgraded at the next login.
+    """
+
+    @property
+    def iterations(self):
+        return get_setting('PBKDF2_ITERATIONS')
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+
+    @property
+    def work_factor(self):
+        return get_setting('SCRYPT_WORK_FACTOR')
+
+    @property
+    def block_size(self):
+        return get_setting('SCRYPT_BLOCK_SIZE')
+
+    @property
+    def parallelism(self):
+        return get_setting('SCRYPT_PARALLELISM')
+
+    @property
+    def maxmem(self):
+        # scrypt needs 128 * block_size * work_factor bytes; leave headroom
+        # above OpenSSL's 32 MiB default so larger work factors work.
+        return 2 * 128 * self.block_size * self.work_factor
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Requires the argon2-cffi package.
+    """
+
+    @property
+    def time_cost(self):
+        return get_setting('ARGON2_TIME_COST')
+
+    @property
+    def memory_cost(self):
+        return get_setting('ARGON2_MEMORY_COST')
+
+    @property
+    def parallelism(self):
+        return get_setting('ARGON2_PARALLELISM')
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Trop de connexions simultanées, veuillez réessayer dans quelques instants."
+    default_code = 'hashing_unavailable'
+    # Sent as Retry-After by DRF's exception handler.
+    wait = 1
+
+
+class HashingPool:
+    """
+    Bounded pool running the password hashing.
+
+    At most WORKERS hashes run at once and MAX_PENDING wait or run;
+    callers beyond that wait up to QUEUE_TIMEOUT seconds for a slot,
+    then get a 503 instead of piling up behind the pool. Async callers
+    await the hash with arun(), leaving the event loop free for other
+    requests; run() blocks the calling thread.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._pending = 0
+        self._condition = threading.Condition()
+
+    @property
+    def executor(self):
+        with self._condition:
+            if self._executor is None:
+                if get_setting('EXECUTOR') == 'process':
+                    # Workers need the app registry to resolve PASSWORD_HASHERS.
+                    self._executor = ProcessPoolExecutor(
+                        get_setting('WORKERS'), initializer=django.setup)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        get_setting('WORKERS'), thread_name_prefix='hashing')
+            return self._executor
+
+    def _try_acquire(self):
+        if self._pending >= get_setting('MAX_PENDING'):
+            return False
+        self._pending += 1
+        return True
+
+    def _release(self):
+        with self._condition:
+            self._pending -= 1
+            self._condition.notify()
+
+    def run(self, func, *args):
+        with self._condition:
+            if not self._condition.wait_for(self._try_acquire,
+                                            timeout=get_setting('QUEUE_TIMEOUT')):
+                raise HashingUnavailable()
+        try:
+            return self.executor.submit(func, *args).result()
+        finally:
+            self._release()
+
+    async def arun(self, func, *args):
+        deadline = time.monotonic() + get_setting('QUEUE_TIMEOUT')
+        while True:
+            with self._condition:
+                if self._try_acquire():
+                    break
+            if time.monotonic() >= deadline:
+                raise HashingUnavailable()
+            await asyncio.sleep(0.01)
+        try:
+            return await asyncio.wrap_future(self.executor.submit(func, *args))
+        finally:
+            self._release()
+
+    def shutdown(self):
+        with self._condition:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+hashing_pool = HashingPool()
+
+UserModel = get_user_model()
+
+
+def make_password(password):
+    return hashing_pool.run(hashers.make_password, password)
+
+
+def verify_password(password, encoded):
+    """
+    Return (is_correct, must_update) like django.contrib.auth.hashers.verify_password.
+    """
+    return hashing_pool.run(hashers.verify_password, password, encoded)
+
+
+async def amake_password(password):
+    return await hashing_pool.arun(hashers.make_password, password)
+
+
+async def averify_password(password, encoded):
+    return await hashing_pool.arun(hashers.verify_password, password, encoded)
+
+
+async def aauthenticate(request=None, **credentials):
+    """
+    Like django.contrib.auth.aauthenticate, but awaiting the backends that
+    have an aauthenticate method instead of running them in a thread.
+    """
+    for backend in get_backends():
+        if hasattr(backend, 'aauthenticate'):
+            user = await backend.aauthenticate(request, **credentials)
+        else:
+            user = await sync_to_async(backend.authenticate)(request, **credentials)
+        if user is not None:
+            return user
+    return None
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend verifying passwords through the hashing pool, and
+    rehashing them when the hasher or its parameters changed.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway, so that unknown usernames take as long as wrong passwords.
+            make_password(password)
+            return None
+
+        is_correct, must_update = verify_password(password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+        if must_update:
+            user.password = make_password(password)
+            user.save(update_fields=['password'])
+        return user
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget(
+                **{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            await amake_password(password)
+            return None
+
+        is_correct, must_update = await averify_password(password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+        if must_update:
+            user.password = await amake_password(password)
+            await user.asave(update_fields=['password'])
+        return user
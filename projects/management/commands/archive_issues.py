@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from projects.archive import archive
+
+
+class Command(BaseCommand):
+    help = ("Move the finished issues without recent activity, with their comments and "
+            "assignments, to the archive tables. Run it periodically, e.g. from cron.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Days without activity before archiving, "
+                                 "ARCHIVE['AGE_DAYS'] by default.")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Issues moved per transaction, ARCHIVE['BATCH_SIZE'] by default.")
+
+    def handle(self, *args, **options):
+        archived = archive(options['days'], options['batch_size'],
+                           progress=lambda moved: self.stdout.write(f"  {moved} issue(s)..."))
+        self.stdout.write(self.style.SUCCESS(f"{archived} issue(s) archived."))
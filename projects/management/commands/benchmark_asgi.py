@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from projects.models import Comment, Issue, Project, User
+
+
+class Command(BaseCommand):
+    help = ("Compare the throughput of the sync DRF read endpoints through the "
+            "WSGI handler with the native async ones through the ASGI handler.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True,
+                            help="User whose projects are read.")
+        parser.add_argument('--requests', type=int, default=2000,
+                            help="Requests per endpoint and mode.")
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help="Requests in flight at once.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found.")
+        project = Project.alive.filter(contributor__user=user).first()
+        issue = Issue.objects.filter(project=project).first() if project else None
+        if issue is None or not Comment.objects.filter(issue=issue).exists():
+            raise CommandError("The user needs a project with an issue that has comments.")
+
+        paths = [
+            'projects/',
+            f'projects/{project.id}/',
+            f'projects/{project.id}/issues/',
+            f'projects/{project.id}/issues/{issue.id}/',
+            f'projects/{project.id}/issues/{issue.id}/comments/',
+        ]
+        headers = {'Authorization': f'JWT {AccessToken.for_user(user)}'}
+        total, concurrency = options['requests'], options['concurrency']
+
+        self.stdout.write(f"{'endpoint':<45} {'WSGI req/s':>12} {'ASGI req/s':>12}")
+        # The async views have neither the response cache nor ETags:
+        # turn them off on the DRF side too, to compare the same work.
+        with override_settings(ALLOWED_HOSTS=['testserver'],
+                               RESPONSE_CACHE={**settings.RESPONSE_CACHE, 'ENABLED': False},
+                               CONDITIONAL_REQUESTS={'ENABLED': False}):
+            for path in paths:
+                wsgi = self.run_wsgi(f'/api/v1/{path}', headers, total, concurrency)
+                asgi = asyncio.run(self.run_asgi(
+                    f'/api/v1/async/{path}', headers, total, concurrency))
+                self.stdout.write(f"{path:<45} {wsgi:>12.1f} {asgi:>12.1f}")
+
+    def run_wsgi(self, url, headers, total, concurrency):
+        local = threading.local()
+
+        def request(_):
+            if not hasattr(local, 'client'):
+                local.client = Client(headers=headers)
+            response = local.client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f"{url} returned {response.status_code}.")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(request, range(total)))
+        return total / (time.perf_counter() - start)
+
+    async def run_asgi(self, url, headers, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request():
+            async with semaphore:
+                response = await client.get(url, headers=headers)
+                if response.status_code != 200:
+                    raise CommandError(f"{url} returned {response.status_code}.")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(total)))
+        return total / (time.perf_counter() - start)
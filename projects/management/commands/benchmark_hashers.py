@@ -0,0 +1,87 @@
+import asyncio
+import os
+import time
+
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from projects.hashing import HashingPool, get_setting
+
+
+def build_hasher(algorithm, params):
+    hasher = {
+        'pbkdf2_sha256': hashers.PBKDF2PasswordHasher,
+        'scrypt': hashers.ScryptPasswordHasher,
+        'argon2': hashers.Argon2PasswordHasher,
+    }[algorithm]()
+    for name, value in params.items():
+        setattr(hasher, name, value)
+    return hasher
+
+
+def verify(algorithm, params, password, encoded):
+    return build_hasher(algorithm, params).verify(password, encoded)
+
+
+class Command(BaseCommand):
+    help = ("Measure password verifications per second, on one core and through "
+            "the hashing pool, for several hasher configurations.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verifications', type=int, default=20,
+                            help="Verifications per configuration and core.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--executor', choices=['thread', 'process'],
+                            default=get_setting('EXECUTOR'))
+        parser.add_argument('--pbkdf2-iterations', type=int, nargs='+',
+                            default=[260000, 600000, 870000])
+        parser.add_argument('--scrypt-work-factors', type=int, nargs='+',
+                            default=[2 ** 14, 2 ** 15])
+
+    def handle(self, *args, **options):
+        configurations = [('pbkdf2_sha256', {'iterations': iterations})
+                          for iterations in options['pbkdf2_iterations']]
+        configurations += [('scrypt', {'work_factor': work_factor,
+                                       'maxmem': 2 * 128 * 8 * work_factor})
+                           for work_factor in options['scrypt_work_factors']]
+        try:
+            hashers.Argon2PasswordHasher()._load_library()
+            configurations.append(('argon2', {}))
+        except ValueError:
+            self.stdout.write("argon2-cffi is not installed, skipping argon2.")
+
+        count, workers = options['verifications'], options['workers']
+        self.stdout.write(f"{'configuration':<36} {'ms/login':>9} "
+                          f"{'logins/s/core':>14} {f'logins/s x{workers}':>14}")
+        pool = HashingPool()
+        with override_settings(PASSWORD_HASHING={
+                'EXECUTOR': options['executor'], 'WORKERS': workers,
+                'MAX_PENDING': count * workers}):
+            try:
+                for algorithm, params in configurations:
+                    hasher = build_hasher(algorithm, params)
+                    encoded = hasher.encode('mot-de-passe', hasher.salt())
+
+                    start = time.perf_counter()
+                    for _ in range(count):
+                        hasher.verify('mot-de-passe', encoded)
+                    single = (time.perf_counter() - start) / count
+
+                    # Start the workers before timing.
+                    asyncio.run(self.verify_all(pool, workers, algorithm, params,
+                                                'mot-de-passe', encoded))
+                    start = time.perf_counter()
+                    asyncio.run(self.verify_all(pool, count * workers, algorithm, params,
+                                                'mot-de-passe', encoded))
+                    pooled = count * workers / (time.perf_counter() - start)
+
+                    label = ' '.join([algorithm, *(f'{k}={v}' for k, v in params.items()
+                                                   if k != 'maxmem')])
+                    self.stdout.write(f"{label:<36} {single * 1000:>9.1f} "
+                                      f"{1 / single:>14.1f} {pooled:>14.1f}")
+            finally:
+                pool.shutdown()
+
+    async def verify_all(self, pool, total, *args):
+        await asyncio.gather(*(pool.arun(verify, *args) for _ in range(total)))
@@ -0,0 +1,157 @@
+import json
+import logging
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from projects.models import Comment, Issue, Project, User
+from projects.replicas import get_setting as get_routing_setting
+
+
+class Command(BaseCommand):
+    help = ("Drive the main API routes, reads then writes, through the test client and "
+            "report latency percentiles, throughput and queries per request, optionally "
+            "against a baseline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='seed0',
+                            help="User the requests are made as (see seed_softdesk).")
+        parser.add_argument('--password', default='softdesk',
+                            help="Password of that user, for the token endpoint.")
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--baseline', help="Compare against a previous --output file.")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Allowed p95 slowdown before flagging a regression.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found, run seed_softdesk first.")
+
+        endpoints = self.get_endpoints(user, options['password'])
+        client = Client(headers={'Authorization': f'JWT {AccessToken.for_user(user)}'})
+
+        # The slow request log would drown the report.
+        logging.getLogger('projects.metrics').setLevel(logging.ERROR)
+        results = {}
+        self.stdout.write(f"{'endpoint':<22} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                          f"{'req/s':>8} {'queries':>8}")
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, (method, url, data) in endpoints.items():
+                with transaction.atomic():
+                    results[name] = self.measure(client, method, url, data, options)
+                    # Leave the data as it was, so that runs stay comparable.
+                    transaction.set_rollback(True)
+                result = results[name]
+                self.stdout.write(
+                    f"{name:<22} {result['p50']:>8.2f} {result['p95']:>8.2f} "
+                    f"{result['p99']:>8.2f} {result['throughput']:>8.1f} {result['queries']:>8}")
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def get_endpoints(self, user, password):
+        project = (Project.alive.filter(contributor__user=user)
+                   .annotate(issue_count=Count('issues')).order_by('-issue_count').first())
+        issue = Issue.objects.filter(project=project).order_by('-comment_count').first()
+        comment = Comment.objects.filter(issue=issue).first()
+        if comment is None:
+            raise CommandError("The user needs a project with commented issues.")
+        own_issue = Issue.objects.filter(project=project, author=user).first()
+
+        projects = f'/api/v1/projects/{project.id}'
+        issues = f'{projects}/issues'
+        comments = f'{issues}/{issue.id}/comments'
+        deep_offset = max(Issue.objects.filter(project=project).count() - 4, 0)
+        endpoints = {
+            'token': ('post', '/api/v1/token/',
+                      {'username': user.username, 'password': password}),
+            'profile': ('get', '/api/v1/profile/', None),
+            'project-list': ('get', '/api/v1/projects/', None),
+            'project-detail': ('get', f'{projects}/', None),
+            'project-search': ('get', f'{projects}/search/?q=probleme', None),
+            'issue-list': ('get', f'{issues}/', None),
+            'issue-list-deep': ('get', f'{issues}/?offset={deep_offset}', None),
+            'issue-list-cursor': ('get', f'{issues}/?pagination=cursor', None),
+            'issue-detail': ('get', f'{issues}/{issue.id}/', None),
+            'comment-list': ('get', f'{comments}/', None),
+            'comment-detail': ('get', f'{comments}/{comment.id}/', None),
+            # Writes last, since they invalidate the caches the reads hit.
+            'comment-create': ('post', f'{comments}/', {'description': 'Commentaire de test.'}),
+        }
+        if own_issue is not None:
+            # Same level as before: every iteration saves the issue unchanged.
+            endpoints['issue-update'] = ('patch', f'{issues}/{own_issue.id}/',
+                                         {'level': own_issue.level})
+        return endpoints
+
+    def measure(self, client, method, url, data, options):
+        def request():
+            if data is None:
+                response = getattr(client, method)(url)
+            elif method == 'post':
+                response = client.post(url, data)
+            else:
+                response = getattr(client, method)(url, data, content_type='application/json')
+            if response.status_code >= 400:
+                raise CommandError(f"{method.upper()} {url} returned {response.status_code}.")
+            return response
+
+        for _ in range(options['warmup']):
+            request()
+
+        latencies, queries = [], []
+        start = time.perf_counter()
+        for _ in range(options['iterations']):
+            with ExitStack() as stack:
+                # Reads may be routed to replicas: count their queries too.
+                captured = [stack.enter_context(CaptureQueriesContext(connections[alias]))
+                            for alias in (DEFAULT_DB_ALIAS, *get_routing_setting('REPLICAS'))]
+                request_start = time.perf_counter()
+                request()
+                latencies.append((time.perf_counter() - request_start) * 1000)
+            queries.append(sum(len(context) for context in captured))
+        elapsed = time.perf_counter() - start
+
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+        return {
+            'p50': cuts[49],
+            'p95': cuts[94],
+            'p99': cuts[98],
+            'throughput': options['iterations'] / elapsed,
+            'queries': max(queries),
+        }
+
+    def compare(self, results, baseline_path, tolerance):
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            before = baseline[name]
+            if result['queries'] > before['queries']:
+                regressions.append(
+                    f"{name}: {before['queries']} -> {result['queries']} queries")
+            if result['p95'] > before['p95'] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: p95 {before['p95']:.2f} -> {result['p95']:.2f} ms")
+
+        if regressions:
+            raise CommandError("Regressions against the baseline:\n" + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regression against the baseline."))
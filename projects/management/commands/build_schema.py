@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from projects.schema import build, schema_path, write
+
+
+class Command(BaseCommand):
+    help = ("Generate the OpenAPI schema as JSON and YAML files, served by /openapi.json, "
+            "/openapi.yaml and the docs pages. Run it at deploy time.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None,
+                            help="Path of the JSON file, API_DOCS['SCHEMA_FILE'] by default. "
+                                 "The YAML file is written next to it.")
+
+    def handle(self, *args, **options):
+        documents = build()
+        write(documents, options['output'])
+        path = options['output'] or schema_path('json')
+        self.stdout.write(self.style.SUCCESS(
+            f"Schema written to {path} ({len(documents['json'])} bytes) and its .yaml sibling."))
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from projects.models import Change
+from projects.sync import get_setting, head
+
+
+class Command(BaseCommand):
+    help = ("Delete the delta-sync change log entries older than the retention period. "
+            "Clients holding an older token get a 410 and download their projects again.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Days of changes to keep, SYNC['RETENTION_DAYS'] by default.")
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else get_setting('RETENTION_DAYS')
+        cutoff = timezone.now() - timedelta(days=days)
+        # The latest entry is always kept, so that ids are never reused.
+        deleted, _ = (Change.objects.filter(time__lt=cutoff)
+                      .exclude(id=head()).delete())
+        self.stdout.write(self.style.SUCCESS(f"{deleted} change(s) deleted."))
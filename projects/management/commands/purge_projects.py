@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from projects.purge import pending, purge_project
+
+
+class Command(BaseCommand):
+    help = ("Delete the data of the projects deleted through the API, in chunks. "
+            "Purges interrupted by a restart carry on where they stopped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int,
+                            help="Projects to purge, every deleted project by default.")
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Rows deleted per transaction, PURGE['CHUNK_SIZE'] by default.")
+
+    def handle(self, *args, **options):
+        project_ids = options['project_ids'] or pending()
+        if not project_ids:
+            self.stdout.write("No project to purge.")
+            return
+        for project_id in project_ids:
+            def progress(step, deleted):
+                self.stdout.write(f"  {step}: {deleted}")
+
+            self.stdout.write(f"Project {project_id}:")
+            deleted = purge_project(project_id, options['chunk_size'], progress)
+            if deleted:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Project {project_id} purged, {sum(deleted.values())} row(s) deleted."))
+            else:
+                self.stdout.write(f"Project {project_id} is not deleted, skipped.")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from projects import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of issues and comments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help="Database to rebuild the index on.")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                "The full-text index requires SQLite with FTS5; "
+                "other backends use the fallback search and need no index.")
+        if not search.rebuild(connection):
+            raise CommandError("FTS5 is not available in this SQLite build.")
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from projects.models import Project
+from projects.stats import reconcile, reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    help = ("Recompute the project statistics counters and the issues' comment_count, "
+            "and fix any drift.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('projects', nargs='*', type=int,
+                            help="Project ids, all projects by default.")
+
+    def handle(self, *args, **options):
+        project_ids = options['projects'] or list(Project.alive.values_list('id', flat=True))
+        fixed = 0
+        for project_id in project_ids:
+            drifted = reconcile(project_id)
+            issues = reconcile_comment_counts(project_id)
+            if issues:
+                drifted.append(('comment_count', f'{issues} issue(s)'))
+            if drifted:
+                fixed += 1
+                self.stdout.write(f"Project {project_id}: fixed " + ', '.join(
+                    f'{dimension}:{value}' if value else dimension
+                    for dimension, value in drifted))
+        self.stdout.write(self.style.SUCCESS(f"{fixed} project(s) had drifted."))
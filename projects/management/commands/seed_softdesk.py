@@ -0,0 +1,147 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from projects.models import Comment, Contributor, Issue, Project, User
+from projects.stats import reconcile, reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    help = ("Generate synthetic users, projects, contributors, issues and comments, "
+            "skewed like real data: a few huge projects and many small ones.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--projects', type=int, default=200)
+        parser.add_argument('--issues', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--huge-projects', type=int, default=3,
+                            help="Number of projects holding most of the data.")
+        parser.add_argument('--huge-share', type=float, default=0.6,
+                            help="Share of issues that belong to the huge projects.")
+        parser.add_argument('--huge-contributors', type=int, default=200,
+                            help="Contributors per huge project.")
+        parser.add_argument('--prefix', default='seed',
+                            help="Username prefix of the generated users.")
+        parser.add_argument('--password', default='softdesk',
+                            help="Password of every generated user.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Random seed, for repeatable datasets.")
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(
+                f"Users prefixed with {options['prefix']!r} already exist, use --prefix.")
+        if options['huge_projects'] > options['projects']:
+            raise CommandError("--huge-projects cannot exceed --projects.")
+
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        start = time.perf_counter()
+
+        with transaction.atomic():
+            user_ids = self.create_users(options)
+            members = self.create_projects(options, user_ids)
+            issue_projects = self.create_issues(options, members)
+            self.create_comments(options, issue_projects, members)
+            # bulk_create bypasses the signals maintaining the counters.
+            for project_id in members:
+                reconcile(project_id)
+                reconcile_comment_counts(project_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded in {time.perf_counter() - start:.1f}s. "
+            f"Log in as {options['prefix']}0 / {options['password']} "
+            f"(author of the largest project)."))
+
+    def create_users(self, options):
+        password = make_password(options['password'])
+        users = User.objects.bulk_create([
+            User(username=f"{options['prefix']}{i}", password=password,
+                 age=self.random.randint(15, 70),
+                 can_be_contacted=self.random.random() < 0.5)
+            for i in range(options['users'])
+        ], batch_size=self.batch_size)
+        self.stdout.write(f"{len(users)} users")
+        return [user.id for user in users]
+
+    def create_projects(self, options, user_ids):
+        """
+        Create projects with their contributors.
+        Returns the contributor ids of each project, keyed by project id.
+        """
+        huge = options['huge_projects']
+        authors = user_ids[:huge] + self.random.choices(user_ids, k=options['projects'] - huge)
+        projects = Project.objects.bulk_create([
+            Project(name=f'Projet {i}', author_id=author_id,
+                    description=f'Projet de test numéro {i}.',
+                    type=self.random.choice(Project.TYPE_CHOICES)[0])
+            for i, author_id in enumerate(authors)
+        ], batch_size=self.batch_size)
+
+        members, contributors = {}, []
+        for i, project in enumerate(projects):
+            size = options['huge_contributors'] if i < huge else self.random.randint(1, 5)
+            others = set(self.random.sample(user_ids, min(size, len(user_ids))))
+            others.discard(project.author_id)
+            members[project.id] = [project.author_id, *others]
+            # bulk_create skips Project.save(), which adds the author.
+            contributors.append(Contributor(user_id=project.author_id, project=project,
+                                            role='AUTHOR'))
+            contributors += [Contributor(user_id=user_id, project=project, role='CONTRIBUTOR')
+                             for user_id in others]
+        Contributor.objects.bulk_create(contributors, batch_size=self.batch_size)
+        self.stdout.write(f"{len(projects)} projects, {len(contributors)} contributors")
+        return members
+
+    def create_issues(self, options, members):
+        project_ids = list(members)
+        huge = project_ids[:options['huge_projects']]
+        small = project_ids[options['huge_projects']:] or huge
+        huge_count = int(options['issues'] * options['huge_share']) if huge else 0
+
+        owners = ([huge[i % len(huge)] for i in range(huge_count)] +
+                  self.random.choices(small, k=options['issues'] - huge_count))
+
+        issue_projects = {}
+        Assignment = Issue.assigned_users.through
+        for start in range(0, len(owners), self.batch_size):
+            issues = Issue.objects.bulk_create([
+                Issue(name=f'Problème {start + i}', project_id=project_id,
+                      author_id=self.random.choice(members[project_id]),
+                      type=self.random.choice(Issue.TYPE_CHOICES)[0],
+                      level=self.random.choice(Issue.LEVEL_CHOICES)[0],
+                      status=self.random.choices(Issue.STATUS_CHOICES, weights=[3, 2, 5])[0][0])
+                for i, project_id in enumerate(owners[start:start + self.batch_size])
+            ])
+            Assignment.objects.bulk_create([
+                Assignment(issue_id=issue.id, user_id=user_id)
+                for issue in issues
+                for user_id in set(self.random.choices(
+                    members[issue.project_id], k=self.random.randint(0, 3)))
+            ], batch_size=self.batch_size)
+            issue_projects.update((issue.id, issue.project_id) for issue in issues)
+        self.stdout.write(f"{len(issue_projects)} issues")
+        return issue_projects
+
+    def create_comments(self, options, issue_projects, members):
+        if not issue_projects:
+            return
+        issue_ids = list(issue_projects)
+        # Pareto weights: most comments land on a few busy issues.
+        weights = [self.random.paretovariate(1.2) for _ in issue_ids]
+        created = 0
+        while created < options['comments']:
+            count = min(self.batch_size, options['comments'] - created)
+            Comment.objects.bulk_create([
+                Comment(issue_id=issue_id,
+                        author_id=self.random.choice(members[issue_projects[issue_id]]),
+                        description=f'Commentaire {created + i} sur le problème {issue_id}.')
+                for i, issue_id in enumerate(self.random.choices(issue_ids, weights, k=count))
+            ])
+            created += count
+        self.stdout.write(f"{created} comments")
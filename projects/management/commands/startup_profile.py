@@ -0,0 +1,128 @@
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.models import User
+from projects.serializers import TokenObtainPairSerializer
+
+# Run in a fresh interpreter: boot the WSGI application and serve one request.
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+ready = time.perf_counter()
+from wsgiref.util import setup_testing_defaults
+environ = {'PATH_INFO': sys.argv[1], 'REQUEST_METHOD': 'GET', 'HTTP_HOST': 'localhost'}
+if sys.argv[2]:
+    environ['HTTP_AUTHORIZATION'] = sys.argv[2]
+setup_testing_defaults(environ)
+statuses = []
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+done = time.perf_counter()
+print(json.dumps({'setup': ready - start, 'first_response': done - start,
+                  'status': statuses[0]}))
+'''
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_importtime(output):
+    """
+    Return [(module, self_us, cumulative_us, depth)] from -X importtime output.
+    """
+    imports = []
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return imports
+
+
+class Command(BaseCommand):
+    help = ("Measure worker startup: import time per module (as python -X importtime) and "
+            "time from process start to the first response. Use --settings to compare "
+            "settings profiles.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/v1/sync/',
+                            help="Path of the first request.")
+        parser.add_argument('--username', default=None,
+                            help="User the request is authenticated as; defaults to the "
+                                 "first user of the database.")
+        parser.add_argument('--anonymous', action='store_true',
+                            help="Send the request without a token.")
+        parser.add_argument('--runs', type=int, default=3,
+                            help="Processes to start; the median timings are reported.")
+        parser.add_argument('--top', type=int, default=15,
+                            help="Number of packages and modules to list.")
+        parser.add_argument('--budget', type=float, default=None,
+                            help="Fail if the median time to first response exceeds "
+                                 "this many milliseconds.")
+
+    def get_authorization(self, options):
+        if options['anonymous']:
+            return ''
+        users = User.objects.filter(is_active=True).order_by('pk')
+        if options['username'] is not None:
+            users = users.filter(username=options['username'])
+        user = users.first()
+        if user is None:
+            raise CommandError("No user to authenticate the request as: "
+                               "pass --username, or --anonymous.")
+        return f"JWT {TokenObtainPairSerializer.get_token(user).access_token}"
+
+    def run_once(self, path, authorization):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD, path, authorization],
+            capture_output=True, text=True)
+        total = time.perf_counter() - started
+        if result.returncode:
+            raise CommandError(f"The worker failed to start:\n{result.stderr[-2000:]}")
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        # Interpreter startup happens before the child's clock starts.
+        timings['process'] = total
+        return timings, parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        authorization = self.get_authorization(options)
+        runs = [self.run_once(options['path'], authorization)
+                for _ in range(max(options['runs'], 1))]
+        median = {key: statistics.median(timings[key] for timings, _ in runs) * 1000
+                  for key in ('setup', 'first_response', 'process')}
+        imports = runs[-1][1]
+        top = options['top']
+
+        self.stdout.write(f"First response ({runs[-1][0]['status']} for {options['path']}), "
+                          f"median of {len(runs)} run(s):")
+        self.stdout.write(f"  Django setup:                  {median['setup']:8.1f} ms")
+        self.stdout.write(f"  Setup to first response:       {median['first_response']:8.1f} ms")
+        self.stdout.write(f"  Process start to exit:         {median['process']:8.1f} ms")
+
+        total = sum(self_us for _, self_us, _, _ in imports)
+        self.stdout.write(f"\n{len(imports)} modules imported in {total / 1000:.1f} ms.")
+
+        packages = Counter()
+        for module, self_us, _, _ in imports:
+            packages[module.split('.')[0]] += self_us
+        self.stdout.write("\nSlowest packages (own import time):")
+        for package, self_us in packages.most_common(top):
+            self.stdout.write(f"  {self_us / 1000:8.1f} ms  {package}")
+
+        self.stdout.write("\nSlowest imports (including what they import):")
+        for module, _, cumulative_us, depth in sorted(
+                imports, key=lambda item: -item[2])[:top]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms  {'  ' * depth}{module}")
+
+        if options['budget'] is not None and median['first_response'] > options['budget']:
+            raise CommandError(
+                f"Time to first response {median['first_response']:.1f} ms exceeds "
+                f"the budget of {options['budget']:.1f} ms.")
@@ -0,0 +1,36 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ("Copy the primary SQLite database onto a file replica, "
+            "using SQLite's online backup so the primary can keep serving writes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='replica',
+                            help="Alias of the replica in DATABASES.")
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in settings.DATABASES or alias == DEFAULT_DB_ALIAS:
+            raise CommandError(f"{alias!r} is not a replica alias of DATABASES.")
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError("sync_replica only copies SQLite databases; "
+                               "use the database's own replication otherwise.")
+
+        replica.close()
+        source = sqlite3.connect(primary.settings_dict['NAME'])
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            with target:
+                source.backup(target)
+            target.execute('PRAGMA journal_mode=WAL')
+        finally:
+            source.close()
+            target.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"{replica.settings_dict['NAME']} is now a copy of {primary.settings_dict['NAME']}."))
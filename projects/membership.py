@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+
+from .models import Contributor
+
+DEFAULTS = {
+    'TIMEOUT': 300,
+    'MAX_ENTRIES': 10000,
+    'USE_DJANGO_CACHE': False,
+    'KEY_PREFIX': 'membership',
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'MEMBERSHIP_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def to_pk(value):
+    """
+    Normalize a primary key coming from URL kwargs or request data.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def membership_rows(user_id):
+    """
+    (project_id, role) of the user's projects, without the deleted ones.
+    """
+    return (Contributor.objects.filter(user_id=user_id, project__deleted_time=None)
+            .values_list('project_id', 'role'))
+
+
+class MembershipCache:
+    """
+    Per-user index of project memberships, as a frozenset of (project_id, role).
+
+    Lookups go through an in-process LRU with TTL, or through Django's
+    cache framework when USE_DJANGO_CACHE is set, and only hit the
+    database on a miss. The shared cache replaces the LRU rather than
+    backing it: an invalidation must reach every worker, and a local copy
+    would keep granting access to a removed contributor until it expires.
+    Entries are invalidated by the Contributor signals in signals.py.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, user_id):
+        return f"{get_setting('KEY_PREFIX')}:{user_id}"
+
+    def _get_local(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, memberships = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return memberships
+
+    def _set_local(self, user_id, memberships):
+        with self._lock:
+            self._entries[user_id] = (
+                time.monotonic() + get_setting('TIMEOUT'), memberships)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > get_setting('MAX_ENTRIES'):
+                self._entries.popitem(last=False)
+
+    def get(self, user_id):
+        if get_setting('USE_DJANGO_CACHE'):
+            cached = django_cache.get(self._key(user_id))
+            if cached is not None:
+                return frozenset(map(tuple, cached))
+            memberships = frozenset(membership_rows(user_id))
+            django_cache.set(self._key(user_id), list(memberships), get_setting('TIMEOUT'))
+            return memberships
+
+        memberships = self._get_local(user_id)
+        if memberships is None:
+            memberships = frozenset(membership_rows(user_id))
+            self._set_local(user_id, memberships)
+        return memberships
+
+    async def aget(self, user_id):
+        if get_setting('USE_DJANGO_CACHE'):
+            cached = await django_cache.aget(self._key(user_id))
+            if cached is not None:
+                return frozenset(map(tuple, cached))
+            memberships = frozenset([row async for row in membership_rows(user_id)])
+            await django_cache.aset(self._key(user_id), list(memberships),
+                                    get_setting('TIMEOUT'))
+            return memberships
+
+        memberships = self._get_local(user_id)
+        if memberships is None:
+            memberships = frozenset([row async for row in membership_rows(user_id)])
+            self._set_local(user_id, memberships)
+        return memberships
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+        if get_setting('USE_DJANGO_CACHE'):
+            django_cache.delete(self._key(user_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+membership_cache = MembershipCache()
+
+
+def get_role(user, project_id):
+    """
+    Return the user's role in the project, or None if they are not a contributor.
+    """
+    project_id = to_pk(project_id)
+    if project_id is None or not user.is_authenticated:
+        return None
+    for member_project_id, role in membership_cache.get(user.pk):
+        if member_project_id == project_id:
+            return role
+    return None
+
+
+def is_contributor(user, project_id):
+    return get_role(user, project_id) is not None
+
+
+def get_project_ids(user):
+    return {project_id for project_id, role in membership_cache.get(user.pk)}
+
+
+async def aget_role(user, project_id):
+    project_id = to_pk(project_id)
+    if project_id is None or not user.is_authenticated:
+        return None
+    for member_project_id, role in await membership_cache.aget(user.pk):
+        if member_project_id == project_id:
+            return role
+    return None
+
+
+async def ais_contributor(user, project_id):
+    return await aget_role(user, project_id) is not None
@@ -0,0 +1,290 @@
+import bisect
+import heapq
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.permissions import BasePermission, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SLOW_REQUEST_THRESHOLD': 0.5,
+    'SLOW_QUERY_COUNT': 3,
+    'ALLOWED_IPS': [],
+}
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def get_setting(name):
+    return getattr(settings, 'METRICS', {}).get(name, DEFAULTS[name])
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def shorten(sql, width=500):
+    return sql if len(sql) <= width else sql[:width] + '…'
+
+
+class Histogram:
+    """
+    Cumulative histogram in the Prometheus sense, one series per label set.
+    """
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        counts, total = self.series.get(labels, ([0] * (len(self.buckets) + 1), 0))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.series[labels] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total) in sorted(self.series.items()):
+            label_text = ','.join(f'{key}="{escape(value)}"' for key, value in labels)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+class Registry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = Histogram(
+            'softdesk_request_duration_seconds', 'Request latency.', DURATION_BUCKETS)
+        self.queries = Histogram(
+            'softdesk_request_queries', 'SQL queries per request.', QUERY_BUCKETS)
+        self.sql_time = Histogram(
+            'softdesk_request_sql_seconds', 'Total SQL time per request.', DURATION_BUCKETS)
+        self.serializer_time = Histogram(
+            'softdesk_request_serializer_seconds', 'Serializer time per request.',
+            DURATION_BUCKETS)
+
+    def record(self, labels, stats, duration):
+        with self._lock:
+            self.latency.observe(labels, duration)
+            self.queries.observe(labels, stats.query_count)
+            self.sql_time.observe(labels, stats.sql_time)
+            self.serializer_time.observe(labels, stats.serializer_time)
+
+    def render(self):
+        # Imported here: cache.py imports this module.
+        from .cache import response_cache
+
+        with self._lock:
+            lines = []
+            for histogram in (self.latency, self.queries, self.sql_time, self.serializer_time):
+                lines += histogram.render()
+        lines += ['# HELP softdesk_response_cache_total Response cache lookups.',
+                  '# TYPE softdesk_response_cache_total counter']
+        for key, value in sorted(response_cache.get_stats().items()):
+            resource, outcome = key.split('.')
+            lines.append(
+                f'softdesk_response_cache_total{{resource="{resource}",outcome="{outcome}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestStats:
+    """
+    Per-request counters, reached through a context variable so that queries
+    run in sync_to_async threads are attributed to the right request.
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.slowest = []
+
+    def add_query(self, sql, duration):
+        self.query_count += 1
+        self.sql_time += duration
+        item = (duration, self.query_count, sql)
+        if len(self.slowest) < get_setting('SLOW_QUERY_COUNT'):
+            heapq.heappush(self.slowest, item)
+        else:
+            heapq.heappushpop(self.slowest, item)
+
+
+current_stats = ContextVar('current_stats', default=None)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """
+    Installed on every connection by install_execute_wrapper().
+    """
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - start)
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def serializer_data(serializer):
+    """
+    Return serializer.data, counting the time spent as serializer time.
+    Nested serializers render within it, so each top-level serialization
+    is counted once.
+    """
+    stats = current_stats.get()
+    if stats is None:
+        return serializer.data
+    start = time.perf_counter()
+    try:
+        return serializer.data
+    finally:
+        stats.serializer_time += time.perf_counter() - start
+
+
+class SerializerTimingMixin:
+    """
+    DRF's list, retrieve, create and update, reading the data through
+    serializer_data(). Goes right before the generic view in the bases, so
+    that the other mixins' versions of these actions take precedence; they
+    call serializer_data() themselves.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer_data(self.get_serializer(page, many=True)))
+        return Response(serializer_data(self.get_serializer(queryset, many=True)))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(serializer_data(self.get_serializer(self.get_object())))
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        data = serializer_data(serializer)
+        return Response(data, status=status.HTTP_201_CREATED,
+                        headers=self.get_success_headers(data))
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        if getattr(instance, '_prefetched_objects_cache', None):
+            # The update may have changed the prefetched relations.
+            instance._prefetched_objects_cache = {}
+        return Response(serializer_data(serializer))
+
+
+class MetricsMiddleware:
+    """
+    Record latency, query count, SQL time and serializer time per view and
+    route, and log the worst queries of requests slower than the threshold.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_setting('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.finish(request, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.finish(request, stats, time.perf_counter() - start)
+        return response
+
+    def start(self):
+        stats = RequestStats()
+        return stats, current_stats.set(stats), time.perf_counter()
+
+    def finish(self, request, stats, duration):
+        match = getattr(request, 'resolver_match', None)
+        labels = (
+            ('view', match.view_name if match else 'unresolved'),
+            ('route', match.route if match else ''),
+            ('method', request.method),
+        )
+        registry.record(labels, stats, duration)
+
+        if duration >= get_setting('SLOW_REQUEST_THRESHOLD'):
+            worst = '\n'.join(
+                f'  {query_duration * 1000:.1f} ms: {shorten(sql)}'
+                for query_duration, _, sql in sorted(stats.slowest, reverse=True))
+            logger.warning(
+                "Slow request %s %s: %.0f ms, %d queries (%.0f ms SQL, %.0f ms serializers)\n%s",
+                request.method, request.path, duration * 1000, stats.query_count,
+                stats.sql_time * 1000, stats.serializer_time * 1000, worst)
+
+
+class IsMetricsScraper(BasePermission):
+    """
+    Allow the addresses listed in ALLOWED_IPS, such as a Prometheus server.
+    """
+
+    def has_permission(self, request, view):
+        return request.META.get('REMOTE_ADDR') in get_setting('ALLOWED_IPS')
+
+
+class MetricsView(APIView):
+    """
+    Prometheus metrics of this process, for administrators and ALLOWED_IPS.
+    """
+    permission_classes = [IsMetricsScraper | IsAdminUser]
+    # Not part of the API: left out of the OpenAPI schema.
+    swagger_schema = None
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4')
+
+
+metrics_view = MetricsView.as_view()
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -11,6 +13,70 @@ class User(AbstractUser):
         return self.username
 
 
+class TouchQuerySet(models.QuerySet):
+
+    def touch(self, **fields):
+        """
+        Bump updated_time without loading rows, so that cached validators
+        of parents change when their children do. Extra fields are updated
+        in the same statement.
+        """
+        return self.update(updated_time=timezone.now(), **fields)
+
+
+class ProjectQuerySet(TouchQuerySet):
+
+    def with_details(self):
+        """
+        Prefetch plan for ProjectSerializer: contributors with their user and
+        the issue summaries, in a fixed number of queries.
+        """
+        return self.prefetch_related(
+            Prefetch('contributor_set',
+                     queryset=Contributor.objects.select_related('user')),
+            Prefetch('issues',
+                     queryset=Issue.objects.only('id', 'name', 'status', 'project_id',
+                                                 'comment_count', 'last_activity_time')),
+        )
+
+
+class ProjectManager(models.Manager.from_queryset(ProjectQuerySet)):
+    """
+    Hide the projects deleted by the API: their rows stay until
+    projects/purge.py removes them with the rest of their data.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_time__isnull=True)
+
+
+class IssueQuerySet(TouchQuerySet):
+
+    def assigned_to(self, user_id):
+        """
+        Issues assigned to the user in the projects they still contribute
+        to, in one query: membership is an EXISTS on the contributor index.
+        """
+        assignments = Issue.assigned_users.through.objects.filter(user_id=user_id)
+        return self.filter(
+            id__in=assignments.values('issue_id'), project__deleted_time=None).filter(
+            Exists(Contributor.objects.filter(user_id=user_id, project_id=OuterRef('project_id'))))
+
+    def with_details(self, comment_ids=True):
+        """
+        Prefetch plan for IssueSerializer: assignee and comment ids only.
+        Without comment_ids, for serializers showing comment_count instead.
+        """
+        queryset = self.prefetch_related(
+            Prefetch('assigned_users', queryset=User.objects.only('id')))
+        if comment_ids:
+            # Comment, or ArchivedComment for archived issues.
+            comment_model = self.model.comment_set.field.model
+            queryset = queryset.prefetch_related(
+                Prefetch('comment_set', queryset=comment_model.objects.only('id', 'issue_id')))
+        return queryset
+
+
 class Project(models.Model):
     name = models.CharField(max_length=50)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -24,6 +90,12 @@ class Project(models.Model):
     type = models.CharField(max_length=50, choices=TYPE_CHOICES)
     created_time = models.DateTimeField(auto_now_add=True)
     updated_time = models.DateTimeField(auto_now=True)
+    # Set when the project is deleted, until its data is purged.
+    deleted_time = models.DateTimeField(null=True, blank=True)
+
+    objects = ProjectQuerySet.as_manager()
+    # Projects not deleted through the API, for everything the API serves.
+    alive = ProjectManager()
 
     def save(self, *args, **kwargs):
         super(Project, self).save(*args, **kwargs)
@@ -39,6 +111,11 @@ class Contributor(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     role = models.CharField(max_length=50, choices=[('AUTHOR', 'Author'), ('CONTRIBUTOR', 'Contributor')])
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'project'], name='contributor_user_project_idx'),
+        ]
+
 
 class Issue(models.Model):
     name = models.CharField(max_length=50)
@@ -66,6 +143,22 @@ class Issue(models.Model):
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='ToDo')
     created_time = models.DateTimeField(auto_now_add=True)
     updated_time = models.DateTimeField(auto_now=True)
+    # Denormalized from the comments, maintained by the Comment signals.
+    comment_count = models.IntegerField(default=0)
+    last_activity_time = models.DateTimeField(default=timezone.now)
+
+    objects = IssueQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'created_time', 'id'], name='issue_project_created_idx'),
+            models.Index(fields=['project', 'last_activity_time', 'id'],
+                         name='issue_project_activity_idx'),
+            models.Index(fields=['project', 'comment_count', 'id'],
+                         name='issue_project_comments_idx'),
+            # Finished issues waiting for projects/archive.py.
+            models.Index(fields=['status', 'last_activity_time'], name='issue_status_activity_idx'),
+        ]
 
     def __str__(self):
         return f'{self.name} : {self.type} - {self.level}'
@@ -78,5 +171,151 @@ class Comment(models.Model):
     created_time = models.DateTimeField(auto_now_add=True)
     updated_time = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['issue', 'created_time', 'id'], name='comment_issue_created_idx'),
+        ]
+
     def __str__(self):
         return f'Issue name: {self.issue.name} - {self.description[:30]}'
+
+
+# The table behind Issue.assigned_users is auto-created and takes no
+# Meta.indexes: this one, created by the post_migrate handler in signals.py,
+# finds a user's assigned issues without reading the table rows.
+ASSIGNMENT_USER_INDEX = (
+    f'CREATE INDEX IF NOT EXISTS assignment_user_issue_idx '
+    f'ON {Issue.assigned_users.through._meta.db_table} (user_id, issue_id)')
+
+
+class ArchivedIssue(models.Model):
+    """
+    Finished issue moved out of Issue by projects/archive.py, with the same
+    columns and id so that it can be moved back unchanged.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=50)
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='archived_authored_issues')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='archived_issues')
+    assigned_users = models.ManyToManyField(User, through='ArchivedAssignment',
+                                            related_name='archived_assigned_issues', blank=True)
+    type = models.CharField(max_length=50, choices=Issue.TYPE_CHOICES)
+    level = models.CharField(max_length=50, choices=Issue.LEVEL_CHOICES)
+    status = models.CharField(max_length=50, choices=Issue.STATUS_CHOICES, default='ToDo')
+    # Copied as they were, hence no auto_now.
+    created_time = models.DateTimeField()
+    updated_time = models.DateTimeField()
+    comment_count = models.IntegerField(default=0)
+    last_activity_time = models.DateTimeField()
+
+    objects = IssueQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'created_time', 'id'],
+                         name='archived_issue_project_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} : {self.type} - {self.level}'
+
+
+class ArchivedAssignment(models.Model):
+    """
+    Row of Issue.assigned_users for an archived issue.
+    """
+    issue = models.ForeignKey(ArchivedIssue, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+
+class ArchivedComment(models.Model):
+    """
+    Comment of an archived issue.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_comments')
+    description = models.TextField(max_length=1200)
+    issue = models.ForeignKey(ArchivedIssue, on_delete=models.CASCADE, related_name='comment_set')
+    created_time = models.DateTimeField()
+    updated_time = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['issue', 'created_time', 'id'],
+                         name='archived_comment_issue_idx'),
+        ]
+
+
+class ProjectStat(models.Model):
+    """
+    One counter of a project's statistics, e.g. ('status', 'ToDo') or
+    ('assignee', '<user id>'). Maintained by projects/stats.py.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='stats')
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=50, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'dimension', 'value'],
+                                    name='project_stat_unique'),
+        ]
+
+
+class Change(models.Model):
+    """
+    Append-only log of writes, read by the delta-sync endpoint and replayed
+    to event streams (see projects/sync.py). Ids are plain integers so that
+    tombstones outlive the rows they describe.
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=[
+        (CREATE, 'Create'), (UPDATE, 'Update'), (DELETE, 'Delete')])
+    project_id = models.BigIntegerField()
+    # Set for issue and comment changes, for the issue event streams.
+    issue_id = models.BigIntegerField(null=True)
+    # Set for contributor changes, so that removed users see their own removal.
+    user_id = models.BigIntegerField(null=True)
+    time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project_id', 'id'], name='change_project_idx'),
+            models.Index(fields=['issue_id', 'id'], name='change_issue_idx'),
+            models.Index(fields=['user_id', 'id'], name='change_user_idx'),
+        ]
+
+
+class Activity(models.Model):
+    """
+    Who created, updated or deleted what in a project. Written in batches
+    by projects/activity.py, so ids and times may not follow the same order.
+    """
+    VERB_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+        ('add', 'Add contributor'),
+        ('remove', 'Remove contributor'),
+    ]
+
+    project_id = models.BigIntegerField()
+    actor_id = models.BigIntegerField(null=True)
+    actor_username = models.CharField(max_length=150, blank=True)
+    verb = models.CharField(max_length=10, choices=VERB_CHOICES)
+    target_model = models.CharField(max_length=20)
+    target_id = models.BigIntegerField()
+    target_name = models.CharField(max_length=255, blank=True)
+    time = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project_id', 'time', 'id'], name='activity_project_time_idx'),
+        ]
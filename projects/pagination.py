@@ -0,0 +1,73 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class CreatedTimeCursorPagination(CursorPagination):
+    """
+    Keyset pagination on (created_time, id), backed by the composite indexes
+    declared on Issue, Comment and Contributor.
+    """
+    ordering = ('created_time', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class ActivityCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the activity feed, newest first, backed by the
+    (project_id, time, id) index.
+    """
+    ordering = ('-time', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class AssignedIssueCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the issues assigned to a user, last updated first.
+    """
+    ordering = ('-updated_time', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class RecentCommentCursorPagination(CursorPagination):
+    """
+    Keyset pagination on comments, newest first.
+    """
+    ordering = ('-created_time', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class CursorOrOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination by default, for backwards compatibility.
+
+    Clients opt into keyset pagination with ``?pagination=cursor``; the
+    ``next``/``previous`` links then carry a ``cursor`` parameter that keeps
+    them in that mode.
+    """
+    max_limit = settings.MAX_PAGE_SIZE
+    cursor_pagination_class = CreatedTimeCursorPagination
+
+    def use_cursor(self, request):
+        params = request.query_params
+        return params.get('pagination') == 'cursor' or 'cursor' in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
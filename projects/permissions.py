@@ -1,7 +1,7 @@
 from rest_framework import permissions
 from rest_framework.exceptions import PermissionDenied
 
-from .models import Contributor
+from .membership import ais_contributor, is_contributor
 
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -12,7 +12,12 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return obj.author == request.user
+        return obj.author_id == request.user.pk
+
+    async def ahas_object_permission(self, request, view, obj):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        return obj.author_id == request.user.pk
 
 
 class IsContributor(permissions.BasePermission):
@@ -24,7 +29,17 @@ class IsContributor(permissions.BasePermission):
 
         project_id = view.kwargs.get('project_pk')
 
-        if not Contributor.objects.filter(project_id=project_id, user=request.user).exists():
+        if not is_contributor(request.user, project_id):
+            raise PermissionDenied(
+                "Vous n'êtes pas contributeur de ce projet.")
+
+        return True
+
+    async def ahas_permission(self, request, view):
+
+        project_id = view.kwargs.get('project_pk')
+
+        if not await ais_contributor(request.user, project_id):
             raise PermissionDenied(
                 "Vous n'êtes pas contributeur de ce projet.")
 
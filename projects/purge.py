@@ -0,0 +1,165 @@
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from . import activity, sync
+from .cache import response_cache
+from .membership import membership_cache
+from .models import (
+    ArchivedAssignment, ArchivedComment, ArchivedIssue, Change, Comment, Contributor, Issue,
+    Project, ProjectStat)
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'CHUNK_SIZE': 1000,
+    'PAUSE': 0.05,
+    'THREAD': True,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'PURGE', {}).get(name, DEFAULTS[name])
+
+
+def soft_delete(project):
+    """
+    Hide the project at once and leave its data to purge_project().
+
+    The change log gets the project's tombstone and one per contributor:
+    the project is not visible to them any more, their own removal is.
+    """
+    contributors = list(Contributor.objects.filter(project=project).values_list('id', 'user_id'))
+    with transaction.atomic():
+        Project.objects.filter(id=project.id).touch(deleted_time=timezone.now())
+        sync.record(sync.entry('project', project.id, project.id, Change.DELETE),
+                    *(sync.entry('contributor', contributor_id, project.id, Change.DELETE,
+                                 user_id=user_id)
+                      for contributor_id, user_id in contributors))
+        activity.record(activity.entry(project.id, Change.DELETE, 'project',
+                                       project.id, project.name))
+        transaction.on_commit(lambda: schedule(project.id))
+    for _, user_id in contributors:
+        membership_cache.invalidate(user_id)
+    response_cache.bump('project', project.id)
+
+
+def steps(project_id):
+    """
+    Rows to delete, leaf tables first, so that a purge stopped at any
+    point leaves no row pointing to a deleted one. The change log and the
+    activity feed are history and keep their entries.
+    """
+    assignments = Issue.assigned_users.through
+    return [
+        ('comments', Comment, Comment.objects.filter(issue__project_id=project_id)),
+        ('assignments', assignments,
+         assignments.objects.filter(issue__project_id=project_id)),
+        ('issues', Issue, Issue.objects.filter(project_id=project_id)),
+        ('archived comments', ArchivedComment,
+         ArchivedComment.objects.filter(issue__project_id=project_id)),
+        ('archived assignments', ArchivedAssignment,
+         ArchivedAssignment.objects.filter(issue__project_id=project_id)),
+        ('archived issues', ArchivedIssue, ArchivedIssue.objects.filter(project_id=project_id)),
+        ('contributors', Contributor, Contributor.objects.filter(project_id=project_id)),
+        ('stats', ProjectStat, ProjectStat.objects.filter(project_id=project_id)),
+        ('project', Project, Project.objects.filter(id=project_id)),
+    ]
+
+
+def delete_rows(model, ids, column=None):
+    """
+    Plain DELETE by primary key, or by column: no collector, no signals.
+    Search index rows go with their issues and comments through the FTS
+    triggers.
+    """
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {quote(model._meta.db_table)} "
+                       f"WHERE {quote(column or model._meta.pk.column)} IN ({placeholders})", ids)
+        return cursor.rowcount
+
+
+def purge_project(project_id, chunk_size=None, progress=None):
+    """
+    Delete a soft-deleted project and everything in it, CHUNK_SIZE rows
+    per transaction. Safe to run again after a crash: it carries on with
+    what is left. progress(step, deleted) is called after each chunk.
+    Returns {step: rows deleted}.
+    """
+    chunk_size = chunk_size or get_setting('CHUNK_SIZE')
+    if not Project.objects.filter(id=project_id, deleted_time__isnull=False).exists():
+        return {}
+    deleted = {}
+    for step, model, queryset in steps(project_id):
+        deleted[step] = 0
+        while True:
+            with transaction.atomic():
+                ids = list(queryset.order_by().values_list('pk', flat=True)[:chunk_size])
+                if ids:
+                    deleted[step] += delete_rows(model, ids)
+            if not ids:
+                break
+            logger.info("Project %s purge: %d %s deleted.", project_id, deleted[step], step)
+            if progress is not None:
+                progress(step, deleted[step])
+            if len(ids) < chunk_size:
+                break
+            # Let other writers take the lock between chunks.
+            time.sleep(get_setting('PAUSE'))
+    return deleted
+
+
+def pending():
+    """
+    Ids of the soft-deleted projects not purged yet.
+    """
+    return list(Project.objects.filter(deleted_time__isnull=False)
+                .order_by('deleted_time').values_list('id', flat=True))
+
+
+class Purger:
+    """
+    Background thread purging the projects deleted by this process, one
+    at a time. Projects left behind by a stopped process are purged by
+    the purge_projects command.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def schedule(self, project_id):
+        self._queue.put(project_id)
+        with self._lock:
+            # Not alive either after a fork: each process runs its own purger.
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='project-purger', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            project_id = self._queue.get()
+            close_old_connections()
+            try:
+                purge_project(project_id)
+            except Exception:
+                logger.exception("Purge of project %s failed.", project_id)
+            finally:
+                close_old_connections()
+
+
+purger = Purger()
+
+
+def schedule(project_id):
+    if get_setting('THREAD'):
+        purger.schedule(project_id)
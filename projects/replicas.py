@@ -0,0 +1,89 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+DEFAULTS = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': 5,
+    'CACHE_ALIAS': 'default',
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'DATABASE_ROUTING', {}).get(name, DEFAULTS[name])
+
+
+# Alias serving the reads of the current request, None for the primary.
+read_alias = ContextVar('read_alias', default=None)
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user):
+    """
+    Send the user's reads to the primary for STICKY_SECONDS, so they see
+    their own writes while the replicas catch up.
+    """
+    caches[get_setting('CACHE_ALIAS')].set(
+        pin_key(user.pk), True, get_setting('STICKY_SECONDS'))
+
+
+def is_pinned(user):
+    return bool(caches[get_setting('CACHE_ALIAS')].get(pin_key(user.pk)))
+
+
+def choose_replica(user):
+    replicas = get_setting('REPLICAS')
+    if not replicas or (user.is_authenticated and is_pinned(user)):
+        return None
+    return random.choice(replicas)
+
+
+class ReplicaRouter:
+    """
+    Reads go to the alias chosen for the current request by
+    ReplicaReadMixin, everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas are copies of the primary, see the sync_replica command.
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    Serve safe requests from a read replica, and pin the user to the
+    primary after a write.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self._read_alias_token = read_alias.set(choose_replica(request.user))
+        elif request.user.is_authenticated:
+            pin_to_primary(request.user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_read_alias_token', None)
+        if token is not None:
+            read_alias.reset(token)
+            self._read_alias_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,29 @@
+import logging
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Django's test runner without the slow request log, which would flood
+    the output on a loaded machine, and with MD5 as the preferred password
+    hasher, so that creating users and logging in cost microseconds instead
+    of a full PBKDF2 run. assertLogs() still sees the warnings, and tests of
+    the real hashers select them with override_settings().
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        logger = logging.getLogger('projects.metrics')
+        self._metrics_level = logger.level
+        logger.setLevel(logging.ERROR)
+        self._hashers = override_settings(PASSWORD_HASHERS=[
+            'django.contrib.auth.hashers.MD5PasswordHasher', *settings.PASSWORD_HASHERS])
+        self._hashers.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._hashers.disable()
+        logging.getLogger('projects.metrics').setLevel(self._metrics_level)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,142 @@
+import hashlib
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+
+DEFAULTS = {
+    'SCHEMA_FILE': None,
+    'LAZY_BUILD': True,
+    'UI': True,
+}
+
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'yaml': 'application/yaml',
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'API_DOCS', {}).get(name, DEFAULTS[name])
+
+
+def schema_path(fmt):
+    path = Path(get_setting('SCHEMA_FILE') or Path(settings.BASE_DIR) / 'openapi.json')
+    return path.with_suffix(f'.{fmt}')
+
+
+def get_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="SoftDesk API",
+        default_version='v1',
+        description="API for SoftDesk project",
+    )
+
+
+def build():
+    """
+    Generate the OpenAPI schema of every endpoint.
+    Returns {format: bytes} for JSON and YAML.
+    """
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    document = OpenAPISchemaGenerator(get_info()).get_schema(request=None, public=True)
+    return {
+        'json': OpenAPICodecJson(validators=[]).encode(document),
+        'yaml': OpenAPICodecYaml(validators=[]).encode(document),
+    }
+
+
+def write(documents, path=None):
+    """
+    Write the documents to path (SCHEMA_FILE by default), with the
+    extension of each format.
+    """
+    for fmt, content in documents.items():
+        target = Path(path).with_suffix(f'.{fmt}') if path else schema_path(fmt)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+
+
+class SchemaStore:
+    """
+    Schema documents kept in memory with their ETag, read from the files
+    written by build_schema, or built on first use with LAZY_BUILD.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents = {}
+
+    def get(self, fmt):
+        """
+        Return (content, etag), or None if the schema is not available.
+        """
+        document = self._documents.get(fmt)
+        if document is not None:
+            return document
+        with self._lock:
+            if fmt not in self._documents:
+                self._load()
+        return self._documents.get(fmt)
+
+    def _load(self):
+        paths = {fmt: schema_path(fmt) for fmt in MEDIA_TYPES}
+        if all(path.exists() for path in paths.values()):
+            documents = {fmt: path.read_bytes() for fmt, path in paths.items()}
+        elif get_setting('LAZY_BUILD'):
+            documents = build()
+        else:
+            return
+        self._documents = {fmt: (content, f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+                           for fmt, content in documents.items()}
+
+    def clear(self):
+        with self._lock:
+            self._documents = {}
+
+
+schema_store = SchemaStore()
+
+
+def schema_view(request, fmt='json'):
+    """
+    The precomputed OpenAPI schema, as JSON or YAML, with an ETag.
+    """
+    document = schema_store.get(fmt)
+    if document is None:
+        return JsonResponse(
+            {"error": "Le schéma de l'API n'a pas été généré (manage.py build_schema)."},
+            status=503)
+    content, etag = document
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(content, content_type=MEDIA_TYPES[fmt])
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@lru_cache(maxsize=None)
+def get_ui_view(renderer):
+    from drf_yasg.views import get_schema_view
+    from rest_framework.permissions import AllowAny
+
+    # The pages load their schema from ?format=openapi, served by docs_view.
+    view = get_schema_view(get_info(), public=True, permission_classes=[AllowAny])
+    return view.with_ui(renderer, cache_timeout=0)
+
+
+def docs_view(request, renderer):
+    """
+    Swagger UI or ReDoc page. drf_yasg is only imported on the first page view.
+    """
+    if request.GET.get('format') == 'openapi':
+        return schema_view(request, 'json')
+    return get_ui_view(renderer)(request)
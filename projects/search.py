@@ -0,0 +1,186 @@
+import logging
+import re
+
+from django.db import DatabaseError, connection, connections, router
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import Comment, Issue
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'projects_search'
+
+# Issues and comments share one FTS5 table: rowid 2*id for an issue and
+# 2*id + 1 for a comment, so triggers can update rows by rowid.
+SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        project_id UNINDEXED, issue_id UNINDEXED, body,
+        tokenize = 'unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_issue_insert AFTER INSERT ON projects_issue BEGIN
+        INSERT INTO {TABLE}(rowid, project_id, issue_id, body)
+        VALUES (2 * NEW.id, NEW.project_id, NEW.id, NEW.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_issue_update AFTER UPDATE OF name ON projects_issue BEGIN
+        UPDATE {TABLE} SET body = NEW.name WHERE rowid = 2 * NEW.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_issue_delete AFTER DELETE ON projects_issue BEGIN
+        DELETE FROM {TABLE} WHERE rowid = 2 * OLD.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_comment_insert AFTER INSERT ON projects_comment BEGIN
+        INSERT INTO {TABLE}(rowid, project_id, issue_id, body)
+        SELECT 2 * NEW.id + 1, project_id, NEW.issue_id, NEW.description
+        FROM projects_issue WHERE id = NEW.issue_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_comment_update AFTER UPDATE OF description ON projects_comment BEGIN
+        UPDATE {TABLE} SET body = NEW.description WHERE rowid = 2 * NEW.id + 1;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_comment_delete AFTER DELETE ON projects_comment BEGIN
+        DELETE FROM {TABLE} WHERE rowid = 2 * OLD.id + 1;
+    END""",
+]
+
+POPULATE = [
+    f"""INSERT INTO {TABLE}(rowid, project_id, issue_id, body)
+        SELECT 2 * id, project_id, id, name FROM projects_issue""",
+    f"""INSERT INTO {TABLE}(rowid, project_id, issue_id, body)
+        SELECT 2 * c.id + 1, i.project_id, c.issue_id, c.description
+        FROM projects_comment c JOIN projects_issue i ON i.id = c.issue_id""",
+]
+
+HIGHLIGHT = ('<mark>', '</mark>')
+
+# Private use characters delimiting matches until the text is escaped.
+MARKERS = ('\ue000', '\ue001')
+
+
+_available = {}
+
+
+def uses_fts(using=connection):
+    if using.alias not in _available:
+        _available[using.alias] = (using.vendor == 'sqlite' and
+                                   TABLE in using.introspection.table_names())
+    return _available[using.alias]
+
+
+def install(using=connection):
+    """
+    Create the FTS5 table and its triggers if the backend supports them.
+    """
+    if using.vendor != 'sqlite':
+        return False
+    try:
+        with using.cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+    except DatabaseError as exc:
+        logger.warning("Full-text search index not available: %s", exc)
+        return False
+    _available[using.alias] = True
+    return True
+
+
+def rebuild(using=connection):
+    """
+    Drop and rebuild the index from the issue and comment tables.
+    """
+    with using.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    if not install(using):
+        return False
+    with using.cursor() as cursor:
+        for statement in POPULATE:
+            cursor.execute(statement)
+    return True
+
+
+def to_match_expression(query):
+    # Quote every term so user input can never be read as FTS5 syntax.
+    terms = re.findall(r'\w+', query)
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def search(project_id, query, limit, offset):
+    """
+    Return (count, results) for issues and comments of a project matching query,
+    best matches first.
+    """
+    using = connections[router.db_for_read(Issue) or 'default']
+    if uses_fts(using):
+        return search_fts(project_id, query, limit, offset, using)
+    return search_fallback(project_id, query, limit, offset)
+
+
+def render_snippet(text):
+    """
+    HTML-escape the user's text, then turn the match markers into HIGHLIGHT tags.
+    """
+    return (escape(text).replace(MARKERS[0], HIGHLIGHT[0])
+            .replace(MARKERS[1], HIGHLIGHT[1]))
+
+
+def search_fts(project_id, query, limit, offset, using=connection):
+    expression = to_match_expression(query)
+    if not expression:
+        return 0, []
+    where = f"{TABLE} MATCH %s AND project_id = %s"
+    with using.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLE} WHERE {where}",
+                       [expression, project_id])
+        count = cursor.fetchone()[0]
+        cursor.execute(
+            f"""SELECT rowid, issue_id,
+                       snippet({TABLE}, 2, %s, %s, '…', 16), bm25({TABLE})
+                FROM {TABLE} WHERE {where}
+                ORDER BY bm25({TABLE}), rowid LIMIT %s OFFSET %s""",
+            [*MARKERS, expression, project_id, limit, offset])
+        rows = cursor.fetchall()
+    return count, [
+        {'type': 'comment' if rowid % 2 else 'issue', 'id': rowid // 2,
+         'issue': issue_id, 'snippet': render_snippet(snippet), 'rank': rank}
+        for rowid, issue_id, snippet, rank in rows
+    ]
+
+
+def highlight(text, terms, width=120):
+    """
+    Rough equivalent of FTS5 snippet() for the fallback search.
+    """
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(match.start() - width // 2, 0) if match else 0
+    excerpt = text[start:start + width]
+    excerpt = pattern.sub(lambda m: f'{MARKERS[0]}{m.group(0)}{MARKERS[1]}', excerpt)
+    return render_snippet(
+        ('…' if start else '') + excerpt + ('…' if start + width < len(text) else ''))
+
+
+def search_fallback(project_id, query, limit, offset):
+    """
+    Search for backends without FTS5: every term must appear (icontains),
+    most recently updated first.
+    """
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return 0, []
+    issue_filter, comment_filter = Q(), Q()
+    for term in terms:
+        issue_filter &= Q(name__icontains=term)
+        comment_filter &= Q(description__icontains=term)
+
+    issues = (Issue.objects.filter(issue_filter, project_id=project_id)
+              .order_by('-updated_time', '-id')
+              .values_list('id', 'id', 'name', 'updated_time'))
+    comments = (Comment.objects.filter(comment_filter, issue__project_id=project_id)
+                .order_by('-updated_time', '-id')
+                .values_list('id', 'issue_id', 'description', 'updated_time'))
+    count = issues.count() + comments.count()
+    rows = sorted([('issue', *row) for row in issues[:offset + limit]] +
+                  [('comment', *row) for row in comments[:offset + limit]],
+                  key=lambda row: (row[4], row[1]), reverse=True)[offset:offset + limit]
+    return count, [
+        {'type': kind, 'id': pk, 'issue': issue_id,
+         'snippet': highlight(text, terms), 'rank': None}
+        for kind, pk, issue_id, text, updated_time in rows
+    ]
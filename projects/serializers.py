@@ -1,6 +1,11 @@
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
 
-from .models import *
+from .authentication import compute_auth_version, get_setting as get_auth_setting
+from .hashing import amake_password, make_password
+
+from .membership import get_project_ids, is_contributor, to_pk
+from .models import Activity, Comment, Issue, Project, User
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -15,10 +20,34 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         user = User(**validated_data)
-        user.set_password(validated_data['password'])
+        user.password = make_password(validated_data['password'])
         user.save()
         return user
 
+    async def asave(self):
+        """
+        Async save(), awaiting the password hash in the hashing pool.
+        """
+        user = User(**self.validated_data)
+        user.password = await amake_password(self.validated_data['password'])
+        await user.asave()
+        self.instance = user
+        return user
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """
+    Serializer for token creation, adding the claims read by StatelessJWTAuthentication.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.username
+        token[get_auth_setting('VERSION_CLAIM')] = compute_auth_version(
+            user.password, user.is_active)
+        return token
+
 
 class UserSerializer(serializers.ModelSerializer):
     """
@@ -32,8 +61,8 @@ class UserSerializer(serializers.ModelSerializer):
                   'can_data_be_shared', 'projects']
 
     def get_projects(self, obj):
-        projects = Project.objects.filter(contributor__user=obj).distinct()
-        project_names = set([project.name for project in projects])
+        # contributor_set is prefetched with its project by UserProfileView.
+        project_names = set([c.project.name for c in obj.contributor_set.all()])
         return list(project_names)
 
 class CommentSerializerList(serializers.ModelSerializer):
@@ -69,7 +98,7 @@ class IssueListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Issue
-        fields = ['id', 'name', 'status']
+        fields = ['id', 'name', 'status', 'comment_count', 'last_activity_time']
 
 
 class IssueSerializer(serializers.ModelSerializer):
@@ -86,17 +115,20 @@ class IssueSerializer(serializers.ModelSerializer):
     class Meta:
         model = Issue
         fields = ['name', 'id', 'type', 'assigned_users',
-                  'author', 'level', 'comments', 'created_time', 'updated_time', 'status']
+                  'author', 'level', 'comments', 'comment_count', 'created_time',
+                  'updated_time', 'last_activity_time', 'status']
+        read_only_fields = ['comment_count', 'last_activity_time']
 
     def validate_assigned_users(self, value):
         project_id = self.initial_data.get(
             'project') or self.context['view'].kwargs.get('project_pk')
-        try:
-            project = Project.objects.get(id=project_id)
-        except Project.DoesNotExist:
+        project_id = to_pk(project_id)
+        request_user = self.context['request'].user
+        if project_id not in get_project_ids(request_user) and \
+                not Project.alive.filter(id=project_id).exists():
             raise serializers.ValidationError("Projet non trouvé.")
         for user in value:
-            if not Contributor.objects.filter(project=project, user=user).exists():
+            if not is_contributor(user, project_id):
                 raise serializers.ValidationError(
                     f"L'utilisateur avec l'ID {user.id} n'est pas un contributeur de ce projet.")
         return value
@@ -107,6 +139,52 @@ class IssueSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class IssueCountSerializer(IssueSerializer):
+    """
+    Serializer for issue details with comment_count only, without the comment ids.
+    """
+
+    class Meta(IssueSerializer.Meta):
+        fields = [field for field in IssueSerializer.Meta.fields if field != 'comments']
+
+
+class AssignedIssueSerializer(IssueCountSerializer):
+    """
+    Serializer for the issues assigned to the user, across projects.
+    """
+
+    class Meta(IssueCountSerializer.Meta):
+        fields = IssueCountSerializer.Meta.fields + ['project']
+        read_only_fields = fields
+
+
+class AssignedCommentSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the recent comments on the issues assigned to the user.
+    """
+    project = serializers.IntegerField(source='project_id', read_only=True)
+    author = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'project', 'issue', 'author', 'description', 'created_time']
+
+    def get_author(self, obj):
+        return {'id': obj.author_id, 'username': obj.author_username}
+
+
+class IssueBulkSerializer(IssueSerializer):
+    """
+    Serializer for bulk issue import.
+    Assignees are plain ids, checked for the whole batch in one query by the view.
+    """
+    assigned_users = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list)
+
+    def validate_assigned_users(self, value):
+        return value
+
+
 class ProjectSerializer(serializers.ModelSerializer):
     """
     Serializer for project details.
@@ -121,5 +199,17 @@ class ProjectSerializer(serializers.ModelSerializer):
                   'author', 'contributors', 'issues']
 
     def get_contributors(self, obj):
-        contributors = Contributor.objects.filter(project=obj)
-        return [{'username': c.user.username, 'role': c.role} for c in contributors]
+        # contributor_set is prefetched with its user by Project.alive.with_details().
+        return [{'username': c.user.username, 'role': c.role}
+                for c in obj.contributor_set.all()]
+
+
+class ActivitySerializer(serializers.ModelSerializer):
+    """
+    Serializer for the entries of a project's activity feed.
+    """
+
+    class Meta:
+        model = Activity
+        fields = ['id', 'actor_id', 'actor_username', 'verb',
+                  'target_model', 'target_id', 'target_name', 'time']
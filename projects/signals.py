@@ -0,0 +1,260 @@
+from collections import Counter
+
+from django.db import connections
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_migrate, post_save, pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import activity, search, stats, sync
+from .authentication import forget_auth_version, set_auth_version
+from .cache import response_cache
+from .membership import membership_cache
+from .models import ASSIGNMENT_USER_INDEX, Change, Comment, Contributor, Issue, Project, User
+
+
+@receiver([post_save, post_delete], sender=Contributor)
+def invalidate_membership(sender, instance, **kwargs):
+    membership_cache.invalidate(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Project)
+def bump_project(sender, instance, **kwargs):
+    response_cache.bump('project', instance.id)
+
+
+@receiver([post_save, post_delete], sender=Contributor)
+@receiver([post_save, post_delete], sender=Issue)
+def touch_project(sender, instance, **kwargs):
+    Project.objects.filter(id=instance.project_id).touch()
+    response_cache.bump('project', instance.project_id)
+
+
+@receiver([post_save, post_delete], sender=Issue)
+def bump_issue(sender, instance, **kwargs):
+    response_cache.bump('issue', instance.id)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def touch_issue(sender, instance, created=False, **kwargs):
+    fields = {'last_activity_time': timezone.now()}
+    if created:
+        fields['comment_count'] = F('comment_count') + 1
+    elif kwargs['signal'] is post_delete:
+        fields['comment_count'] = F('comment_count') - 1
+    Issue.objects.filter(id=instance.issue_id).touch(**fields)
+    response_cache.bump('issue', instance.issue_id)
+    # Project details embed the issue's comment_count and last_activity_time.
+    project_id = comment_project_id(instance)
+    if project_id is not None:
+        Project.objects.filter(id=project_id).touch()
+        response_cache.bump('project', project_id)
+
+
+@receiver(m2m_changed, sender=Issue.assigned_users.through)
+def touch_assigned_issue(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        issue_ids = list(Issue.objects.filter(
+            assigned_users=instance).values_list('id', flat=True))
+    elif reverse and action in ('post_add', 'post_remove'):
+        issue_ids = list(pk_set)
+    elif not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        issue_ids = [instance.id]
+    else:
+        return
+    Issue.objects.filter(id__in=issue_ids).touch()
+    response_cache.bump('issue', *issue_ids)
+    if reverse:
+        issues = Issue.objects.filter(id__in=issue_ids).values_list('id', 'project_id')
+    else:
+        issues = [(instance.id, instance.project_id)]
+    sync.record(*(sync.entry('issue', issue_id, project_id) for issue_id, project_id in issues))
+
+
+STAT_FIELDS = {'project', 'project_id', 'status', 'level', 'type'}
+
+
+@receiver(pre_save, sender=Issue)
+def remember_issue_stats(sender, instance, update_fields=None, **kwargs):
+    instance._stats_previous = None
+    if instance.pk and (update_fields is None or STAT_FIELDS & set(update_fields)):
+        instance._stats_previous = Issue.objects.filter(pk=instance.pk).values_list(
+            'project_id', 'status', 'level', 'type').first()
+
+
+@receiver(post_save, sender=Issue)
+def count_issue(sender, instance, created, **kwargs):
+    current = (instance.project_id, instance.status, instance.level, instance.type)
+    previous = None if created else getattr(instance, '_stats_previous', None)
+    if created:
+        stats.apply_issues([current])
+    elif previous is not None and previous != current:
+        stats.apply_issues([previous], sign=-1)
+        stats.apply_issues([current])
+
+
+@receiver(pre_delete, sender=Issue)
+def remember_issue_assignees(sender, instance, **kwargs):
+    # The assignment rows are deleted without m2m_changed signals.
+    instance._stats_assignees = list(instance.assigned_users.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Issue)
+def uncount_issue(sender, instance, **kwargs):
+    stats.apply_issues([(instance.project_id, instance.status, instance.level, instance.type)],
+                       sign=-1)
+    stats.apply_assignments(instance.project_id, getattr(instance, '_stats_assignees', []),
+                            sign=-1)
+
+
+def comment_project_id(comment):
+    """
+    Project of the comment's issue, read once per signal dispatch.
+    """
+    if not hasattr(comment, '_project_id'):
+        comment._project_id = Issue.objects.filter(id=comment.issue_id).values_list(
+            'project_id', flat=True).first()
+    return comment._project_id
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def count_comment(sender, instance, created=False, **kwargs):
+    if kwargs['signal'] is post_save and not created:
+        return
+    project_id = comment_project_id(instance)
+    if project_id is not None:
+        stats.apply(project_id, {('comments', ''): 1 if created else -1})
+
+
+@receiver(m2m_changed, sender=Issue.assigned_users.through)
+def count_assignments(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # Remember what is about to be cleared for post_clear.
+        if reverse:
+            instance._stats_cleared = list(Issue.objects.filter(
+                assigned_users=instance).values_list('project_id', flat=True))
+        else:
+            instance._stats_cleared = list(instance.assigned_users.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    sign = 1 if action == 'post_add' else -1
+
+    if not reverse:
+        user_ids = pk_set if action != 'post_clear' else getattr(instance, '_stats_cleared', [])
+        stats.apply_assignments(instance.project_id, user_ids, sign)
+        return
+
+    if action == 'post_clear':
+        project_ids = getattr(instance, '_stats_cleared', [])
+    else:
+        project_ids = Issue.objects.filter(id__in=pk_set).values_list('project_id', flat=True)
+    for project_id, count in Counter(project_ids).items():
+        stats.apply(project_id, {('assignee', str(instance.pk)): sign * count})
+
+
+def change_action(kwargs):
+    if kwargs['signal'] is post_delete:
+        return Change.DELETE
+    return Change.CREATE if kwargs.get('created') else Change.UPDATE
+
+
+@receiver([post_save, post_delete], sender=Project)
+def log_project_change(sender, instance, **kwargs):
+    sync.record(sync.entry('project', instance.id, instance.id, change_action(kwargs)))
+
+
+@receiver([post_save, post_delete], sender=Contributor)
+def log_contributor_change(sender, instance, **kwargs):
+    sync.record(sync.entry('contributor', instance.id, instance.project_id,
+                           change_action(kwargs), user_id=instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=Issue)
+def log_issue_change(sender, instance, **kwargs):
+    sync.record(sync.entry('issue', instance.id, instance.project_id, change_action(kwargs)))
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def log_comment_change(sender, instance, **kwargs):
+    project_id = comment_project_id(instance)
+    if project_id is not None:
+        # The issue's comment_count and last_activity_time changed with it.
+        sync.record(sync.entry('comment', instance.id, project_id, change_action(kwargs),
+                               issue_id=instance.issue_id),
+                    sync.entry('issue', instance.issue_id, project_id))
+
+
+@receiver([post_save, post_delete], sender=Project)
+def log_project_activity(sender, instance, **kwargs):
+    activity.record(activity.entry(instance.id, change_action(kwargs), 'project',
+                                   instance.id, instance.name))
+
+
+@receiver([post_save, post_delete], sender=Issue)
+def log_issue_activity(sender, instance, **kwargs):
+    activity.record(activity.entry(instance.project_id, change_action(kwargs), 'issue',
+                                   instance.id, instance.name))
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def log_comment_activity(sender, instance, **kwargs):
+    project_id = comment_project_id(instance)
+    if project_id is not None:
+        activity.record(activity.entry(project_id, change_action(kwargs), 'comment',
+                                       instance.id, instance.description[:100]))
+
+
+@receiver([post_save, post_delete], sender=Contributor)
+def log_contributor_activity(sender, instance, created=False, **kwargs):
+    if kwargs['signal'] is post_save and not created:
+        return
+    # Only name the user when it is already loaded: no query for the log.
+    username = instance.user.username if Contributor.user.is_cached(instance) else ''
+    activity.record(activity.entry(instance.project_id, 'add' if created else 'remove',
+                                   'contributor', instance.user_id, username))
+
+
+@receiver(post_save, sender=User)
+def log_user_memberships(sender, instance, created, **kwargs):
+    # Contributor changes embed the username.
+    if not created:
+        sync.record(*(sync.entry('contributor', contributor_id, project_id, user_id=instance.pk)
+                      for contributor_id, project_id in Contributor.objects.filter(
+                          user=instance).values_list('id', 'project_id')))
+
+
+@receiver(post_save, sender=User)
+def update_auth_version(sender, instance, **kwargs):
+    set_auth_version(instance)
+
+
+@receiver(post_delete, sender=User)
+def revoke_auth_version(sender, instance, **kwargs):
+    forget_auth_version(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def touch_user_projects(sender, instance, created, update_fields=None, **kwargs):
+    # Project details embed contributor usernames.
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    project_ids = list(Contributor.objects.filter(
+        user=instance).values_list('project_id', flat=True))
+    if project_ids:
+        Project.objects.filter(id__in=project_ids).touch()
+        response_cache.bump('project', *project_ids)
+
+
+@receiver(post_migrate)
+def install_search_index(sender, using, **kwargs):
+    if sender.name == 'projects':
+        search.install(connections[using])
+
+
+@receiver(post_migrate)
+def install_assignment_index(sender, using, **kwargs):
+    if sender.name == 'projects':
+        with connections[using].cursor() as cursor:
+            cursor.execute(ASSIGNMENT_USER_INDEX)
@@ -0,0 +1,143 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import (
+    ArchivedAssignment, ArchivedComment, ArchivedIssue, Comment, Issue, ProjectStat, User)
+
+ISSUE_DIMENSIONS = {
+    'status': Issue.STATUS_CHOICES,
+    'level': Issue.LEVEL_CHOICES,
+    'type': Issue.TYPE_CHOICES,
+}
+
+
+def issue_keys(status, level, type):
+    """
+    Counter keys an issue contributes to.
+    """
+    return [('issues', ''), ('status', status), ('level', level), ('type', type)]
+
+
+def apply(project_id, deltas):
+    """
+    Add deltas, a {(dimension, value): delta} mapping, to the project's counters.
+    Each statement adds to the stored count with an F-expression, so that
+    concurrent writers never overwrite each other.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    increments = [key for key, delta in deltas.items() if delta > 0]
+    if increments:
+        ProjectStat.objects.bulk_create([
+            ProjectStat(project_id=project_id, dimension=dimension, value=value)
+            for dimension, value in increments
+        ], ignore_conflicts=True)
+
+    by_delta = defaultdict(list)
+    for key, delta in deltas.items():
+        by_delta[delta].append(key)
+    for delta, keys in by_delta.items():
+        keys_filter = Q()
+        for dimension, value in keys:
+            keys_filter |= Q(dimension=dimension, value=value)
+        ProjectStat.objects.filter(keys_filter, project_id=project_id).update(
+            count=F('count') + delta)
+
+
+def apply_issues(issues, sign=1):
+    """
+    Count or uncount issues given as (project_id, status, level, type) tuples.
+    """
+    by_project = defaultdict(Counter)
+    for project_id, *fields in issues:
+        for key in issue_keys(*fields):
+            by_project[project_id][key] += sign
+    for project_id, deltas in by_project.items():
+        apply(project_id, deltas)
+
+
+def apply_assignments(project_id, user_ids, sign=1):
+    apply(project_id, Counter({('assignee', str(user_id)): sign for user_id in user_ids}))
+
+
+def compute(project_id):
+    """
+    Counters recomputed from the issue, comment and assignment tables,
+    archived ones included.
+    """
+    counts = Counter()
+    for issue_model, comment_model, assignment_model in (
+            (Issue, Comment, Issue.assigned_users.through),
+            (ArchivedIssue, ArchivedComment, ArchivedAssignment)):
+        issues = issue_model.objects.filter(project_id=project_id)
+        counts[('issues', '')] += issues.count()
+        for dimension in ISSUE_DIMENSIONS:
+            for row in issues.values(dimension).annotate(total=Count('id')).order_by():
+                counts[(dimension, row[dimension])] += row['total']
+        counts[('comments', '')] += comment_model.objects.filter(
+            issue__project_id=project_id).count()
+        assignments = (assignment_model.objects
+                       .filter(issue__project_id=project_id)
+                       .values('user_id').annotate(total=Count('id')).order_by())
+        for row in assignments:
+            counts[('assignee', str(row['user_id']))] += row['total']
+    return +counts
+
+
+def reconcile(project_id):
+    """
+    Rewrite the project's counters from compute(). Returns the keys that had drifted.
+    """
+    with transaction.atomic():
+        expected = compute(project_id)
+        stored = {(stat.dimension, stat.value): stat.count
+                  for stat in ProjectStat.objects.select_for_update().filter(project_id=project_id)}
+        drifted = sorted(key for key in expected.keys() | stored.keys()
+                         if expected.get(key, 0) != stored.get(key, 0))
+        if drifted:
+            ProjectStat.objects.filter(project_id=project_id).delete()
+            ProjectStat.objects.bulk_create([
+                ProjectStat(project_id=project_id, dimension=dimension, value=value, count=count)
+                for (dimension, value), count in expected.items()
+            ])
+    return drifted
+
+
+def reconcile_comment_counts(project_id):
+    """
+    Fix Issue.comment_count where it drifted. Returns the number of issues fixed.
+    """
+    counts = (Comment.objects.filter(issue=OuterRef('pk')).order_by()
+              .values('issue').annotate(total=Count('id')).values('total'))
+    actual = Coalesce(Subquery(counts), 0)
+    return (Issue.objects.filter(project_id=project_id)
+            .annotate(actual=actual).exclude(comment_count=F('actual'))
+            .update(comment_count=actual))
+
+
+def get_stats(project_id):
+    """
+    Statistics payload of the project, read from its counters only.
+    """
+    counters = defaultdict(dict)
+    for dimension, value, count in ProjectStat.objects.filter(
+            project_id=project_id, count__gt=0).values_list('dimension', 'value', 'count'):
+        counters[dimension][value] = count
+
+    assignees = counters['assignee']
+    usernames = dict(User.objects.filter(
+        id__in=[int(user_id) for user_id in assignees]).values_list('id', 'username'))
+    return {
+        'issues': counters['issues'].get('', 0),
+        'comments': counters['comments'].get('', 0),
+        **{dimension: {value: counters[dimension].get(value, 0) for value, _ in choices}
+           for dimension, choices in ISSUE_DIMENSIONS.items()},
+        'assignees': sorted(
+            ({'id': int(user_id), 'username': usernames[int(user_id)], 'issues': count}
+             for user_id, count in assignees.items() if int(user_id) in usernames),
+            key=lambda assignee: (-assignee['issues'], assignee['id'])),
+    }
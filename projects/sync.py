@@ -0,0 +1,268 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import Max, Min, Q
+
+from .events import get_broker, issue_channel, project_channel
+from .export import export_fields, render
+from .membership import membership_cache
+from .models import Change, Comment, Contributor, Issue, Project
+from .serializers import CommentSerializer, IssueSerializer, ProjectSerializer
+
+DEFAULTS = {
+    'PAGE_SIZE': 500,
+    'RETENTION_DAYS': 30,
+}
+
+TOKEN_SALT = 'projects.sync'
+
+# Changes pushed to the event streams.
+STREAMED_MODELS = ('issue', 'comment')
+
+
+def get_setting(name):
+    return getattr(settings, 'SYNC', {}).get(name, DEFAULTS[name])
+
+
+class ExpiredToken(Exception):
+    """
+    The changes after the token were pruned from the log.
+    """
+
+
+def entry(model, object_id, project_id, action=Change.UPDATE, issue_id=None, user_id=None):
+    if model == 'issue':
+        issue_id = object_id
+    return Change(model=model, object_id=object_id, project_id=project_id,
+                  action=action, issue_id=issue_id, user_id=user_id)
+
+
+def record(*changes):
+    """
+    Append changes to the log, in a single statement, and publish the
+    streamed ones once the transaction commits.
+    """
+    if not changes:
+        return
+    Change.objects.bulk_create(changes)
+    streamed = [change for change in changes if change.model in STREAMED_MODELS]
+    if streamed:
+        transaction.on_commit(lambda: publish(streamed))
+
+
+def encode_token(change_id):
+    return signing.dumps(change_id, salt=TOKEN_SALT, compress=True)
+
+
+def decode_token(token):
+    """
+    Return the change id of a token, or None if it was not issued by this server.
+    """
+    try:
+        change_id = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+    return change_id if isinstance(change_id, int) and change_id >= 0 else None
+
+
+def head():
+    return Change.objects.aggregate(head=Max('id'))['head'] or 0
+
+
+def check_since(since):
+    """
+    Raise ExpiredToken if changes after since were pruned.
+    """
+    first = Change.objects.aggregate(first=Min('id'))['first']
+    if first is not None and since + 1 < first:
+        raise ExpiredToken()
+
+
+def visible_to(user):
+    """
+    Changes of the user's projects, and the removal of their own memberships,
+    which is how they learn that a project left their view.
+    """
+    project_ids = [project_id for project_id, role in membership_cache.get(user.pk)]
+    return Q(project_id__in=project_ids) | Q(model='contributor', user_id=user.pk)
+
+
+def load_projects(ids):
+    fields = export_fields(ProjectSerializer)
+    return {row['id']: render(fields, row)
+            for row in Project.alive.filter(id__in=ids).values(*fields)}
+
+
+def load_contributors(ids):
+    return {row['id']: {'id': row['id'], 'user_id': row['user_id'],
+                        'username': row['user__username'], 'role': row['role'],
+                        'project': row['project_id']}
+            for row in Contributor.objects.filter(id__in=ids).values(
+                'id', 'user_id', 'user__username', 'role', 'project_id')}
+
+
+def load_issues(ids):
+    fields = export_fields(IssueSerializer)
+    rows = {row['id']: {**render(fields, row), 'project': row['project_id'],
+                        'assigned_users': []}
+            for row in Issue.objects.filter(id__in=ids).values(*fields, 'project_id')}
+    for issue_id, user_id in (Issue.assigned_users.through.objects
+                              .filter(issue_id__in=rows).order_by('user_id')
+                              .values_list('issue_id', 'user_id')):
+        rows[issue_id]['assigned_users'].append(user_id)
+    return rows
+
+
+def load_comments(ids):
+    fields = export_fields(CommentSerializer)
+    return {row['id']: {**render(fields, row), 'issue': row['issue_id']}
+            for row in Comment.objects.filter(id__in=ids).values(*fields, 'issue_id')}
+
+
+LOADERS = {
+    'project': load_projects,
+    'contributor': load_contributors,
+    'issue': load_issues,
+    'comment': load_comments,
+}
+
+
+def snapshot(project_ids, skip):
+    """
+    Upserts of the projects and of their issues and comments, for a user
+    who just became a contributor: their older changes are not in the
+    user's delta. Objects in skip already have a change in the page.
+    """
+    objects = [('project', project_id, project_id) for project_id in sorted(project_ids)]
+    objects += [('issue', issue_id, project_id) for issue_id, project_id in
+                Issue.objects.filter(project_id__in=project_ids).order_by('id')
+                .values_list('id', 'project_id')]
+    objects += [('comment', comment_id, project_id) for comment_id, project_id in
+                Comment.objects.filter(issue__project_id__in=project_ids).order_by('id')
+                .values_list('id', 'issue__project_id')]
+    objects = [item for item in objects if item[:2] not in skip]
+
+    ids = defaultdict(list)
+    for model, object_id, project_id in objects:
+        ids[model].append(object_id)
+    data = {model: LOADERS[model](object_ids) for model, object_ids in ids.items()}
+    return [{'type': model, 'action': 'upsert', 'id': object_id, 'project': project_id,
+             'data': data[model][object_id]}
+            for model, object_id, project_id in objects if object_id in data[model]]
+
+
+def changes_since(user, since, limit=None):
+    """
+    Return (changes, next_since, has_more): the user's changes after the
+    change id since, at most limit of them, read with one keyset query on
+    the change log plus one query per type of changed object.
+
+    Several changes of an object collapse into its latest one, and upserts
+    carry the object's current state. When the user joined a project,
+    its whole content follows their membership.
+    """
+    limit = min(limit or get_setting('PAGE_SIZE'), get_setting('PAGE_SIZE'))
+    last = head()
+    if since >= last:
+        return [], since, False
+    check_since(since)
+
+    page = list(Change.objects.filter(visible_to(user), id__gt=since, id__lte=last)
+                .order_by('id')
+                .values('id', 'model', 'object_id', 'project_id', 'action', 'user_id')
+                [:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+    next_since = page[-1]['id'] if has_more else last
+
+    latest = {}
+    joined = set()
+    for change in page:
+        key = change['model'], change['object_id']
+        latest.pop(key, None)
+        latest[key] = change
+        if change['model'] == 'contributor' and change['action'] == Change.CREATE \
+                and change['user_id'] == user.pk:
+            joined.add(key)
+
+    upserted = {}
+    for key, change in latest.items():
+        if change['action'] != Change.DELETE:
+            upserted.setdefault(change['model'], []).append(change['object_id'])
+    data = {model: LOADERS[model](ids) for model, ids in upserted.items()}
+
+    changes = []
+    for (model, object_id), change in latest.items():
+        deleted = change['action'] == Change.DELETE
+        item = {'type': model, 'action': 'delete' if deleted else 'upsert', 'id': object_id,
+                'project': change['project_id']}
+        if not deleted:
+            if object_id not in data[model]:
+                # Deleted since: its tombstone comes with a later page.
+                continue
+            item['data'] = data[model][object_id]
+        changes.append(item)
+
+    joined_projects = {change['project_id'] for key, change in latest.items()
+                       if key in joined and change['action'] != Change.DELETE
+                       and change['object_id'] in data['contributor']}
+    if joined_projects:
+        changes += snapshot(joined_projects, latest)
+    return changes, next_since, has_more
+
+
+def channels(change):
+    yield project_channel(change.project_id)
+    if change.issue_id is not None:
+        yield issue_channel(change.issue_id)
+
+
+def build_events(changes):
+    """
+    Return (change, event) pairs for issue and comment changes, with the
+    current state of the created or updated objects.
+    """
+    ids = defaultdict(set)
+    for change in changes:
+        if change.action != Change.DELETE:
+            ids[change.model].add(change.object_id)
+    data = {model: LOADERS[model](object_ids) for model, object_ids in ids.items()}
+
+    events = []
+    for change in changes:
+        payload = {'id': change.object_id, 'project': change.project_id,
+                   'issue': change.issue_id}
+        if change.action != Change.DELETE:
+            if change.object_id not in data[change.model]:
+                # Deleted since: its delete event follows.
+                continue
+            payload['data'] = data[change.model][change.object_id]
+        events.append((change, {'id': change.id, 'event': f'{change.model}.{change.action}',
+                                'data': payload}))
+    return events
+
+
+def publish(changes):
+    """
+    Send the changes to the event streams listening to their project or issue.
+    """
+    broker = get_broker()
+    changes = [change for change in changes
+               if any(broker.has_subscribers(channel) for channel in channels(change))]
+    for change, event in build_events(changes):
+        for channel in channels(change):
+            broker.publish(channel, event)
+
+
+def replay(since, limit, **filters):
+    """
+    Return (events, next_since, has_more) for the streamed changes after
+    the change id since matching filters (project_id or issue_id), reading
+    at most limit changes.
+    """
+    changes = list(Change.objects.filter(model__in=STREAMED_MODELS, id__gt=since, **filters)
+                   .order_by('id')[:limit])
+    next_since = changes[-1].id if changes else since
+    return [event for change, event in build_events(changes)], next_since, len(changes) == limit
@@ -0,0 +1,1410 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.contrib.auth import hashers
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import archive, purge, schema, search, stats, sync
+from .activity import activity_buffer
+from .cache import response_cache
+from .hashing import hashing_pool
+from .membership import MembershipCache, membership_cache
+from .models import Activity, ArchivedIssue, Change, Comment, Contributor, Issue, Project, User
+
+
+@override_settings(ACTIVITY={'THREAD': False}, PURGE={'THREAD': False})
+class SoftDeskTestCase(TestCase):
+    """
+    Base test case with a project author authenticated on the API client.
+    Activity entries are flushed and deleted projects purged by the tests,
+    not by background threads.
+    """
+
+    def setUp(self):
+        cache.clear()
+        membership_cache.clear()
+        self.author = User.objects.create_user(
+            username='author', password='password', age=30)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def tearDown(self):
+        activity_buffer.clear()
+
+    def create_project(self, name='Projet'):
+        return Project.objects.create(
+            name=name, author=self.author, description='Description', type='back-end')
+
+    def create_users(self, count, prefix='user'):
+        return User.objects.bulk_create([
+            User(username=f'{prefix}{i}', age=30) for i in range(count)])
+
+    def create_issues(self, project, count):
+        return Issue.objects.bulk_create([
+            Issue(name=f'Issue {i}', author=self.author, project=project,
+                  type='BUG', level='LOW') for i in range(count)])
+
+
+class SerializationQueryCountTests(SoftDeskTestCase):
+    """
+    List and detail pages must cost a fixed number of queries, whatever the
+    number of contributors, issues, assignees and comments they embed.
+    """
+
+    sizes = [1, 10, 100]
+
+    def test_project_list(self):
+        for size in self.sizes:
+            with self.subTest(size=size):
+                project = self.create_project(f'Projet {size}')
+                users = self.create_users(size, prefix=f'p{size}-')
+                Contributor.objects.bulk_create([
+                    Contributor(user=user, project=project, role='CONTRIBUTOR')
+                    for user in users])
+                self.create_issues(project, size)
+
+                # exists, validator, count, page, contributors with users, issues
+                with self.assertNumQueries(6):
+                    response = self.client.get('/api/v1/projects/')
+                self.assertEqual(response.status_code, 200)
+
+    def test_project_detail(self):
+        for size in self.sizes:
+            with self.subTest(size=size):
+                project = self.create_project(f'Projet {size}')
+                users = self.create_users(size, prefix=f'p{size}-')
+                Contributor.objects.bulk_create([
+                    Contributor(user=user, project=project, role='CONTRIBUTOR')
+                    for user in users])
+                self.create_issues(project, size)
+                self.client.get(f'/api/v1/projects/{project.id}/')
+                cache.clear()
+
+                # validator, project, contributors with users, issues
+                with self.assertNumQueries(4):
+                    response = self.client.get(f'/api/v1/projects/{project.id}/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['contributors']), size + 1)
+                self.assertEqual(len(response.data['issues']), size)
+
+    def test_issue_list(self):
+        for size in self.sizes:
+            with self.subTest(size=size):
+                project = self.create_project(f'Projet {size}')
+                users = self.create_users(size, prefix=f'i{size}-')
+                issues = self.create_issues(project, size)
+                for issue in issues:
+                    issue.assigned_users.set(users)
+                    Comment.objects.bulk_create([
+                        Comment(author=self.author, issue=issue, description='Texte')
+                        for _ in range(size)])
+                self.client.get(f'/api/v1/projects/{project.id}/issues/')
+
+                # exists, validator, count, page, assignees, comments
+                with self.assertNumQueries(6):
+                    response = self.client.get(f'/api/v1/projects/{project.id}/issues/')
+                self.assertEqual(response.status_code, 200)
+
+    def test_user_profile(self):
+        for size in self.sizes:
+            with self.subTest(size=size):
+                for i in range(size):
+                    self.create_project(f'Profil {size}-{i}')
+                self.client.force_authenticate(User.objects.get(pk=self.author.pk))
+
+                # contributors with projects
+                with self.assertNumQueries(1):
+                    response = self.client.get('/api/v1/profile/')
+                self.assertEqual(response.status_code, 200)
+
+
+class MembershipCacheTests(SoftDeskTestCase):
+    """
+    Removing a contributor revokes their access at once, in every worker.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.member = User.objects.create_user(username='member', password='password', age=30)
+        Contributor.objects.create(user=self.member, project=self.project, role='CONTRIBUTOR')
+        self.entry = (self.project.id, 'CONTRIBUTOR')
+
+    def remove_member(self):
+        response = self.client.delete(f'/api/v1/projects/{self.project.id}/remove_contributor/',
+                                      {'user_id': self.member.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_removal_invalidates_the_local_entry(self):
+        member_client = APIClient()
+        member_client.force_authenticate(self.member)
+        url = f'/api/v1/projects/{self.project.id}/'
+        self.assertEqual(member_client.get(url).status_code, 200)
+
+        self.remove_member()
+        self.assertEqual(member_client.get(url).status_code, 403)
+
+    @override_settings(MEMBERSHIP_CACHE={'USE_DJANGO_CACHE': True})
+    def test_removal_reaches_other_workers(self):
+        # Another process: its own MembershipCache, the same Django cache.
+        worker = MembershipCache()
+        self.assertIn(self.entry, worker.get(self.member.pk))
+
+        self.remove_member()
+        self.assertNotIn(self.entry, worker.get(self.member.pk))
+
+    @override_settings(MEMBERSHIP_CACHE={'USE_DJANGO_CACHE': True})
+    def test_removal_reaches_other_async_workers(self):
+        worker = MembershipCache()
+        self.assertIn(self.entry, async_to_sync(worker.aget)(self.member.pk))
+
+        self.remove_member()
+        self.assertNotIn(self.entry, async_to_sync(worker.aget)(self.member.pk))
+
+
+class PaginationTests(SoftDeskTestCase):
+
+    def test_cursor_pagination_walks_every_issue(self):
+        project = self.create_project()
+        issues = self.create_issues(project, 7)
+        url = f'/api/v1/projects/{project.id}/issues/?pagination=cursor&page_size=3'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen += [issue['id'] for issue in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, [issue.id for issue in issues])
+
+    def test_offset_pagination_stays_default(self):
+        project = self.create_project()
+        self.create_issues(project, 5)
+        response = self.client.get(f'/api/v1/projects/{project.id}/issues/')
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 4)
+
+        response = self.client.get(f'/api/v1/projects/{project.id}/issues/?limit=1000')
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class BulkEndpointTests(SoftDeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+
+    def test_bulk_contributors(self):
+        users = self.create_users(3)
+        response = self.client.post(
+            f'/api/v1/projects/{self.project.id}/contributors/bulk/',
+            {'user_ids': [user.id for user in users]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Contributor.objects.filter(project=self.project).count(), 4)
+
+        response = self.client.post(
+            f'/api/v1/projects/{self.project.id}/contributors/bulk/',
+            {'user_ids': [users[0].id, 0]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_bulk_issues_in_constant_queries(self):
+        users = self.create_users(2)
+        Contributor.objects.bulk_create([
+            Contributor(user=user, project=self.project, role='CONTRIBUTOR')
+            for user in users])
+        payload = [{'name': f'Issue {i}', 'type': 'BUG', 'level': 'LOW',
+                    'assigned_users': [user.id for user in users]}
+                   for i in range(1000)]
+
+        # A handful of multi-row INSERTs, batched by SQLite's parameter limit,
+        # instead of thousands of round trips.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                f'/api/v1/projects/{self.project.id}/issues/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertLess(len(queries), 35)
+        self.assertEqual(Issue.objects.filter(project=self.project).count(), 1000)
+        self.assertEqual(Issue.assigned_users.through.objects.count(), 2000)
+
+    def test_bulk_issues_rejects_whole_batch(self):
+        outsider = self.create_users(1, prefix='outsider')[0]
+        payload = [{'name': 'Valide', 'type': 'BUG', 'level': 'LOW'},
+                   {'name': 'Assignée', 'type': 'BUG', 'level': 'LOW',
+                    'assigned_users': [outsider.id]},
+                   {'name': 'Invalide', 'type': 'UNKNOWN', 'level': 'LOW'}]
+        response = self.client.post(
+            f'/api/v1/projects/{self.project.id}/issues/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        results = response.data['results']
+        self.assertEqual(results[0], {})
+        self.assertIn('assigned_users', results[1]['errors'])
+        self.assertIn('type', results[2]['errors'])
+        self.assertFalse(Issue.objects.exists())
+
+    def test_bulk_comments(self):
+        issue = self.create_issues(self.project, 1)[0]
+        payload = [{'description': f'Commentaire {i}'} for i in range(50)]
+        response = self.client.post(
+            f'/api/v1/projects/{self.project.id}/issues/{issue.id}/comments/bulk/',
+            payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(issue.comment_set.count(), 50)
+
+
+class ExportTests(SoftDeskTestCase):
+
+    def test_export_streams_ndjson(self):
+        project = self.create_project()
+        issues = self.create_issues(project, 3)
+        issues[0].assigned_users.add(self.author)
+        Comment.objects.create(author=self.author, issue=issues[1], description='Texte')
+
+        response = self.client.get(f'/api/v1/projects/{project.id}/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        records = [json.loads(line) for line in
+                   b''.join(response.streaming_content).decode().splitlines()]
+
+        types = [record['type'] for record in records]
+        self.assertEqual(types, ['project', 'contributor'] + ['issue'] * 3 + ['comment'])
+        self.assertEqual(records[0]['data']['name'], project.name)
+        self.assertEqual(records[2]['data']['assigned_users'], [self.author.id])
+        self.assertEqual(records[5]['data']['issue'], issues[1].id)
+
+
+class ConditionalGetTests(SoftDeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.issue = self.create_issues(self.project, 1)[0]
+        self.issue_url = f'/api/v1/projects/{self.project.id}/issues/{self.issue.id}/'
+
+    def test_unchanged_issue_returns_304(self):
+        etag = self.client.get(self.issue_url)['ETag']
+        response = self.client.get(self.issue_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_comment_invalidates_issue_etag(self):
+        etag = self.client.get(self.issue_url)['ETag']
+        Comment.objects.create(author=self.author, issue=self.issue, description='Texte')
+        response = self.client.get(self.issue_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unchanged_list_returns_304_without_serializing(self):
+        url = f'/api/v1/projects/{self.project.id}/issues/'
+        etag = self.client.get(url)['ETag']
+        # exists, validator
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_renamed_contributor_invalidates_project_etags(self):
+        urls = ['/api/v1/projects/', f'/api/v1/projects/{self.project.id}/']
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        self.author.username = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['contributors'][0]['username'], 'renamed')
+
+    def test_lists_are_not_dated(self):
+        url = f'/api/v1/projects/{self.project.id}/issues/'
+        self.create_issues(self.project, 1)
+        self.assertNotIn('Last-Modified', self.client.get(url))
+        self.assertIn('Last-Modified', self.client.get(self.issue_url))
+
+        # Deleting the older issue leaves max(updated_time) where it was.
+        self.issue.delete()
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(timezone.now().timestamp()))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+
+
+class ResponseCacheTests(SoftDeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.issue = self.create_issues(self.project, 1)[0]
+        self.issue_url = f'/api/v1/projects/{self.project.id}/issues/{self.issue.id}/'
+
+    def test_cached_issue_is_served_without_loading_it(self):
+        self.client.get(self.issue_url)
+        # exists, validator
+        with self.assertNumQueries(2):
+            response = self.client.get(self.issue_url)
+        self.assertEqual(response.data['name'], self.issue.name)
+
+    def test_new_comments_refresh_the_project_detail(self):
+        project_url = f'/api/v1/projects/{self.project.id}/'
+        etag = self.client.get(project_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.issue_url + 'comments/', {'description': 'Texte'})
+        response = self.client.get(project_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['issues'][0]['comment_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.issue_url + 'comments/bulk/',
+                             [{'description': 'Un'}, {'description': 'Deux'}], format='json')
+        response = self.client.get(project_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['issues'][0]['comment_count'], 3)
+
+    def test_changes_bump_the_cached_version(self):
+        self.client.get(self.issue_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(author=self.author, issue=self.issue, description='Texte')
+            self.issue.assigned_users.add(self.author)
+        response = self.client.get(self.issue_url)
+        self.assertEqual(len(response.data['comments']), 1)
+        self.assertEqual(response.data['assigned_users'], [self.author.id])
+
+        project_url = f'/api/v1/projects/{self.project.id}/'
+        self.client.get(project_url)
+        outsider = self.create_users(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Contributor.objects.create(user=outsider, project=self.project, role='CONTRIBUTOR')
+        response = self.client.get(project_url)
+        self.assertEqual(len(response.data['contributors']), 2)
+
+    def test_versions_are_bumped_on_commit(self):
+        version = response_cache.get_version('issue', self.issue.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.issue.name = 'Renommé'
+            self.issue.save()
+            # A read before the commit still sees the old row.
+            self.assertEqual(response_cache.get_version('issue', self.issue.id), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(response_cache.get_version('issue', self.issue.id), version)
+
+    def test_cached_issue_is_not_served_under_another_project(self):
+        self.client.get(self.issue_url)
+        other = self.create_project('Autre')
+        self.create_issues(other, 1)
+        response = self.client.get(f'/api/v1/projects/{other.id}/issues/{self.issue.id}/')
+        self.assertEqual(response.status_code, 404)
+
+
+class AsyncReadTests(SoftDeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.issue = self.create_issues(self.project, 1)[0]
+        Comment.objects.create(author=self.author, issue=self.issue, description='Texte')
+
+    def auth_headers(self, user):
+        return {'Authorization': f'JWT {AccessToken.for_user(user)}'}
+
+    async def test_async_reads_match_sync_responses(self):
+        headers = self.auth_headers(self.author)
+        for path in ['projects/',
+                     f'projects/{self.project.id}/',
+                     f'projects/{self.project.id}/issues/',
+                     f'projects/{self.project.id}/issues/{self.issue.id}/',
+                     f'projects/{self.project.id}/issues/{self.issue.id}/comments/']:
+            with self.subTest(path=path):
+                response = await self.async_client.get(
+                    f'/api/v1/async/{path}', headers=headers)
+                expected = await self.async_client.get(f'/api/v1/{path}', headers=headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected.json())
+
+    async def test_async_reads_require_membership(self):
+        outsider = await User.objects.acreate(username='outsider', age=30)
+        response = await self.async_client.get(
+            f'/api/v1/async/projects/{self.project.id}/issues/',
+            headers=self.auth_headers(outsider))
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get('/api/v1/async/projects/')
+        self.assertEqual(response.status_code, 401)
+
+
+class SearchTests(SoftDeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.issue = Issue.objects.create(
+            name='Crash au démarrage', author=self.author, project=self.project,
+            type='BUG', level='HIGH')
+        self.comment = Comment.objects.create(
+            author=self.author, issue=self.issue,
+            description="L'application plante au démarrage sur Android.")
+        other = self.create_project('Autre')
+        Issue.objects.create(name='Démarrage lent', author=self.author, project=other,
+                             type='BUG', level='LOW')
+        self.url = f'/api/v1/projects/{self.project.id}/search/'
+
+    def test_search_ranks_and_highlights_within_project(self):
+        response = self.client.get(self.url, {'q': 'demarrage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        found = {(result['type'], result['id']) for result in response.data['results']}
+        self.assertEqual(found, {('issue', self.issue.id), ('comment', self.comment.id)})
+        self.assertIn('<mark>', response.data['results'][0]['snippet'])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.comment.description = 'Corrigé.'
+        self.comment.save()
+        response = self.client.get(self.url, {'q': 'android'})
+        self.assertEqual(response.data['count'], 0)
+        self.issue.delete()
+        response = self.client.get(self.url, {'q': 'crash'})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_fallback_search(self):
+        count, results = search.search_fallback(self.project.id, 'démarrage', 10, 0)
+        self.assertEqual(count, 2)
+        self.assertIn('<mark>', results[0]['snippet'])
+
+    def test_fallback_pages_are_stable(self):
+        comments = Comment.objects.bulk_create([
+            Comment(author=self.author, issue=self.issue, description=f'Démarrage {i}')
+            for i in range(4)])
+        Comment.objects.update(updated_time=self.comment.updated_time)
+        Issue.objects.update(updated_time=self.comment.updated_time - timedelta(days=1))
+        pages = [search.search_fallback(self.project.id, 'démarrage', 2, offset)[1]
+                 for offset in (0, 2, 4)]
+        found = [(result['type'], result['id']) for page in pages for result in page]
+        self.assertEqual(len(set(found)), 6)
+        self.assertEqual([result['id'] for result in pages[0]],
+                         [comment.id for comment in reversed(comments)][:2])
+
+    def test_snippets_escape_user_text(self):
+        Comment.objects.create(author=self.author, issue=self.issue,
+                               description='<script>alert(1)</script> démarrage')
+        snippets = [result['snippet'] for result in
+                    self.client.get(self.url, {'q': 'alert'}).data['results'] +
+                    search.search_fallback(self.project.id, 'alert', 10, 0)[1]]
+        self.assertEqual(len(snippets), 2)
+        for snippet in snippets:
+            self.assertNotIn('<script>', snippet)
+            self.assertIn('&lt;script&gt;<mark>alert</mark>', snippet)
+
+
+class MetricsTests(SoftDeskTestCase):
+
+    def test_requests_are_recorded_per_view(self):
+        project = self.create_project()
+        self.create_issues(project, 2)[0].assigned_users.add(self.author)
+        self.client.get(f'/api/v1/projects/{project.id}/issues/')
+        # Served by SerializerTimingMixin.list
+        self.client.get('/api/v1/me/issues/')
+
+        with self.settings(METRICS={'ALLOWED_IPS': ['127.0.0.1']}):
+            response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('softdesk_request_queries_count{view="project-issues-list"', text)
+        for view in ('project-issues-list', 'me-issues'):
+            serializer_sum = next(
+                line for line in text.splitlines()
+                if line.startswith(f'softdesk_request_serializer_seconds_sum{{view="{view}"'))
+            self.assertGreater(float(serializer_sum.split()[-1]), 0)
+
+    def test_metrics_are_restricted(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with self.settings(METRICS={'ALLOWED_IPS': ['10.0.0.2']}):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.2')
+            self.assertEqual(response.status_code, 200)
+
+        self.author.is_staff = True
+        self.author.save()
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_slow_requests_are_logged_with_their_queries(self):
+        project = self.create_project()
+        with self.settings(METRICS={'SLOW_REQUEST_THRESHOLD': 0}), \
+                self.assertLogs('projects.metrics', 'WARNING') as logs:
+            self.client.get(f'/api/v1/projects/{project.id}/')
+        self.assertIn('SELECT', logs.output[0])
+
+
+class StatelessAuthTests(SoftDeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.create_issues(self.project, 2)
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/v1/token/', {'username': 'author', 'password': 'password'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"JWT {response.json()['access']}")
+
+    def test_authentication_costs_no_query(self):
+        self.client.get(f'/api/v1/projects/{self.project.id}/issues/')
+        # Same six queries as SerializationQueryCountTests.test_issue_list: none for the user.
+        with self.assertNumQueries(6):
+            response = self.client.get(f'/api/v1/projects/{self.project.id}/issues/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_loads_the_user_lazily(self):
+        response = self.client.get('/api/v1/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['age'], 30)
+
+    def test_password_change_revokes_tokens(self):
+        self.author.set_password('nouveau')
+        self.author.save()
+        response = self.client.get('/api/v1/projects/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_tokens_without_version_still_work(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {AccessToken.for_user(self.author)}')
+        response = self.client.get(f'/api/v1/projects/{self.project.id}/')
+        self.assertEqual(response.status_code, 200)
+
+
+class PasswordHashingTests(SoftDeskTestCase):
+
+    def login(self, password='password'):
+        return APIClient().post('/api/v1/token/', {'username': 'author', 'password': password})
+
+    def test_registration_and_login_await_the_pool(self):
+        with mock.patch.object(hashing_pool, 'arun', wraps=hashing_pool.arun) as arun:
+            response = APIClient().post('/api/v1/register/', {
+                'username': 'nouveau', 'password': 'secret', 'age': 20,
+                'can_be_contacted': False, 'can_data_be_shared': False}, format='json')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(arun.await_args.args[0], hashers.make_password)
+            self.assertTrue(User.objects.get(username='nouveau').check_password('secret'))
+
+            response = APIClient().post('/api/v1/token/', {
+                'username': 'nouveau', 'password': 'secret'})
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('access', response.json())
+            self.assertEqual(arun.await_args.args[0], hashers.verify_password)
+        self.assertEqual(arun.await_count, 2)
+
+    @override_settings(PASSWORD_HASHERS=['projects.hashing.PBKDF2PasswordHasher',
+                                         'django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_login_rehashes_with_new_parameters(self):
+        with self.settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 1000}):
+            self.assertEqual(self.login().status_code, 200)
+            self.author.refresh_from_db()
+            self.assertTrue(self.author.password.startswith('pbkdf2_sha256$1000$'))
+            self.assertEqual(self.login('mauvais').status_code, 401)
+
+    def test_saturated_pool_answers_503(self):
+        with self.settings(PASSWORD_HASHING={'MAX_PENDING': 0, 'QUEUE_TIMEOUT': 0}):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+@override_settings(DATABASE_ROUTING={'REPLICAS': ['replica'], 'STICKY_SECONDS': 5})
+@override_settings(ACTIVITY={'THREAD': False})
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    The test replica mirrors the default database through a second
+    connection, which only sees committed rows: hence TransactionTestCase.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        membership_cache.clear()
+        self.author = User.objects.create_user(username='author', age=30)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+        project = Project.objects.create(
+            name='Projet', author=self.author, description='Description', type='back-end')
+        self.issue = Issue.objects.create(name='Issue', author=self.author, project=project,
+                                          type='BUG', level='LOW')
+        self.url = f'/api/v1/projects/{project.id}/issues/'
+
+    def tearDown(self):
+        activity_buffer.clear()
+
+    def test_reads_go_to_the_replica(self):
+        # Permission checks run before routing; warm the membership cache.
+        self.client.get(self.url)
+        with CaptureQueriesContext(connections['replica']) as replica, \
+                CaptureQueriesContext(connections['default']) as primary:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica.captured_queries)
+        self.assertFalse(primary.captured_queries)
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        response = self.client.post(self.url, {
+            'name': 'Nouveau', 'type': 'BUG', 'level': 'LOW', 'assigned_users': []},
+            format='json')
+        self.assertEqual(response.status_code, 201)
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 2)
+        self.assertFalse(replica.captured_queries)
+
+    def test_replica_reads_are_not_cached(self):
+        url = f'{self.url}{self.issue.id}/'
+        self.client.get(url)
+        hits = response_cache.get_stats().get('issue.hit', 0)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response_cache.get_stats().get('issue.hit', 0), hits)
+
+
+class ProjectStatsTests(SoftDeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.url = f'/api/v1/projects/{self.project.id}/stats/'
+
+    def test_counters_follow_writes(self):
+        issue = Issue.objects.create(name='A', author=self.author, project=self.project,
+                                     type='BUG', level='HIGH')
+        Issue.objects.create(name='B', author=self.author, project=self.project,
+                             type='TASK', level='LOW', status='Finished')
+        issue.assigned_users.add(self.author)
+        Comment.objects.create(author=self.author, issue=issue, description='Texte')
+        issue.status = 'InProgress'
+        issue.save()
+
+        # membership, counters, assignee usernames
+        with self.assertNumQueries(3):
+            data = self.client.get(self.url).data
+        self.assertEqual(data['issues'], 2)
+        self.assertEqual(data['comments'], 1)
+        self.assertEqual(data['status'], {'ToDo': 0, 'InProgress': 1, 'Finished': 1})
+        self.assertEqual(data['type']['BUG'], 1)
+        self.assertEqual(data['assignees'],
+                         [{'id': self.author.id, 'username': 'author', 'issues': 1}])
+
+        issue.delete()
+        data = self.client.get(self.url).data
+        self.assertEqual((data['issues'], data['comments'], data['assignees']), (1, 0, []))
+
+    def test_bulk_writes_and_reconcile_agree(self):
+        response = self.client.post(f'/api/v1/projects/{self.project.id}/issues/bulk/', [
+            {'name': f'Issue {i}', 'type': 'BUG', 'level': 'LOW',
+             'assigned_users': [self.author.id]} for i in range(3)], format='json')
+        self.assertEqual(response.status_code, 201)
+        expected = self.client.get(self.url).data
+        self.assertEqual(expected['issues'], 3)
+        self.assertEqual(expected['assignees'][0]['issues'], 3)
+
+        self.assertEqual(stats.reconcile(self.project.id), [])
+        self.project.stats.update(count=0)
+        self.assertTrue(stats.reconcile(self.project.id))
+        self.assertEqual(self.client.get(self.url).data, expected)
+
+
+class IssueActivityTests(SoftDeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.quiet, self.busy = self.create_issues(self.project, 2)
+        for i in range(3):
+            Comment.objects.create(author=self.author, issue=self.busy, description=f'{i}')
+        self.url = f'/api/v1/projects/{self.project.id}/issues/'
+
+    def test_comment_writes_maintain_the_counters(self):
+        self.busy.refresh_from_db()
+        self.assertEqual(self.busy.comment_count, 3)
+        self.assertGreater(self.busy.last_activity_time, self.quiet.last_activity_time)
+        self.busy.comment_set.first().delete()
+        self.busy.refresh_from_db()
+        self.assertEqual(self.busy.comment_count, 2)
+
+    def test_most_active_issues_first(self):
+        response = self.client.get(self.url, {'ordering': '-last_activity_time'})
+        self.assertEqual([issue['id'] for issue in response.data['results']],
+                         [self.busy.id, self.quiet.id])
+        response = self.client.get(self.url, {'min_comments': 1})
+        self.assertEqual(response.data['count'], 1)
+        response = self.client.get(self.url, {'min_comments': 'beaucoup'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_count_mode_skips_the_comment_ids(self):
+        # membership, exists, validator, count, page, assignees: no comment prefetch
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url, {'comments': 'count'})
+        busy = next(issue for issue in response.data['results'] if issue['id'] == self.busy.id)
+        self.assertNotIn('comments', busy)
+        self.assertEqual(busy['comment_count'], 3)
+
+
+class SparseFieldsTests(SoftDeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.issues = self.create_issues(self.project, 3)
+        self.issues[0].assigned_users.add(self.author)
+        self.url = f'/api/v1/projects/{self.project.id}/issues/'
+
+    def test_column_fields_skip_model_instances(self):
+        # membership, exists, validator, count, page: no prefetch
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url, {'fields': 'id,name,status,created_time'})
+        self.assertEqual(response.status_code, 200)
+        full = self.client.get(self.url).data['results']
+        self.assertEqual(response.data['results'],
+                         [{key: issue[key] for key in ('id', 'name', 'status', 'created_time')}
+                          for issue in full])
+
+    def test_method_fields_use_the_trimmed_serializer(self):
+        response = self.client.get(self.url, {'fields': 'id,assigned_users',
+                                              'expand': 'author'})
+        first = response.data['results'][0]
+        self.assertEqual(set(first), {'id', 'assigned_users', 'author'})
+        self.assertEqual(first['author'], {'id': self.author.id, 'username': 'author'})
+
+    def test_trimmed_serializer_loads_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,name,assigned_users'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'assigned_users'})
+        self.assertEqual(response.data['results'][0]['assigned_users'], [self.author.id])
+        page = [query['sql'] for query in queries.captured_queries
+                if '"projects_issue"."name"' in query['sql']]
+        self.assertEqual(len(page), 1)
+        self.assertNotIn('"projects_issue"."level"', page[0])
+
+    def test_cursor_pagination_on_rows(self):
+        response = self.client.get(self.url, {'fields': 'id,name', 'expand': 'author',
+                                              'pagination': 'cursor', 'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['results'][0]['author']['username'], 'author')
+        response = self.client.get(response.data['next'])
+        self.assertEqual([issue['id'] for issue in response.data['results']],
+                         [self.issues[2].id])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(self.url, {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {'fields': ''})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/v1/projects/', {'expand': 'issues'})
+        self.assertEqual(response.status_code, 400)
+
+
+class DeltaSyncTests(SoftDeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.url = '/api/v1/sync/'
+        self.since = self.client.get(self.url).data['next']
+
+    def sync(self, **params):
+        response = self.client.get(self.url, {'since': self.since, **params})
+        self.assertEqual(response.status_code, 200)
+        self.since = response.data['next']
+        return response.data
+
+    def test_changes_collapse_to_current_state(self):
+        issue = Issue.objects.create(name='Bug', author=self.author, project=self.project,
+                                     type='BUG', level='LOW')
+        comment = Comment.objects.create(author=self.author, issue=issue, description='1')
+        issue.assigned_users.add(self.author)
+        comment_id = comment.id
+        comment.delete()
+
+        changes = self.sync()['changes']
+        self.assertEqual([(change['type'], change['action'], change['id'])
+                          for change in changes],
+                         [('comment', 'delete', comment_id), ('issue', 'upsert', issue.id)])
+        self.assertEqual(changes[1]['data']['assigned_users'], [self.author.id])
+        self.assertEqual(changes[1]['data']['comment_count'], 0)
+        self.assertEqual(self.sync()['changes'], [])
+
+    def test_steady_state_reads_only_the_log(self):
+        self.sync()
+        # head only: nothing was written since
+        with self.assertNumQueries(1):
+            self.assertEqual(self.sync()['changes'], [])
+
+    def test_keyset_pages(self):
+        response = self.client.post(f'/api/v1/projects/{self.project.id}/issues/bulk/', [
+            {'name': f'Issue {i}', 'type': 'BUG', 'level': 'LOW'} for i in range(5)],
+            format='json')
+        self.assertEqual(response.status_code, 201)
+        ids = []
+        data = self.sync(limit=2)
+        ids += [change['id'] for change in data['changes']]
+        while data['has_more']:
+            data = self.sync(limit=2)
+            ids += [change['id'] for change in data['changes']]
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(ids, sorted(ids))
+
+    def test_visibility_and_removal(self):
+        other = User.objects.create_user(username='other', password='password', age=30)
+        Project.objects.create(name='Autre', author=other, description='', type='iOS')
+        contributor = Contributor.objects.create(user=other, project=self.project,
+                                                 role='CONTRIBUTOR')
+        self.assertEqual([change['type'] for change in self.sync()['changes']],
+                         ['contributor'])
+
+        self.client.force_authenticate(other)
+        since = self.client.get(self.url).data['next']
+        contributor.delete()
+        Issue.objects.create(name='Bug', author=self.author, project=self.project,
+                             type='BUG', level='LOW')
+        changes = self.client.get(self.url, {'since': since}).data['changes']
+        self.assertEqual([(change['type'], change['action']) for change in changes],
+                         [('contributor', 'delete')])
+
+    def test_joined_project_is_sent_in_full(self):
+        issue = Issue.objects.create(name='Bug', author=self.author, project=self.project,
+                                     type='BUG', level='LOW')
+        comment = Comment.objects.create(author=self.author, issue=issue, description='1')
+        other = User.objects.create_user(username='other', password='password', age=30)
+        self.client.force_authenticate(other)
+        self.since = self.client.get(self.url).data['next']
+
+        Contributor.objects.create(user=other, project=self.project, role='CONTRIBUTOR')
+        changes = self.sync()['changes']
+        self.assertEqual([(change['type'], change['action'], change['id'])
+                          for change in changes],
+                         [('contributor', 'upsert', changes[0]['id']),
+                          ('project', 'upsert', self.project.id),
+                          ('issue', 'upsert', issue.id),
+                          ('comment', 'upsert', comment.id)])
+        self.assertEqual(changes[2]['data']['name'], 'Bug')
+        self.assertEqual(self.sync()['changes'], [])
+
+    def test_invalid_and_expired_tokens(self):
+        response = self.client.get(self.url, {'since': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        for i in range(3):
+            Issue.objects.create(name=f'Bug {i}', author=self.author, project=self.project,
+                                 type='BUG', level='LOW')
+        Change.objects.update(time=Change.objects.first().time.replace(year=2000))
+        call_command('prune_changes', stdout=StringIO())
+        self.assertEqual(Change.objects.count(), 1)
+        response = self.client.get(self.url, {'since': self.since})
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(self.client.get(
+            self.url, {'since': sync.encode_token(sync.head())}).status_code, 200)
+
+
+def parse_frames(chunks):
+    events = []
+    for frame in ''.join(chunks).split('\n\n'):
+        if frame and not frame.startswith(':'):
+            fields = dict(line.split(': ', 1) for line in frame.split('\n'))
+            events.append({'id': int(fields['id']), 'event': fields['event'],
+                           'data': json.loads(fields['data'])})
+    return events
+
+
+@override_settings(EVENTS={'HEARTBEAT_SECONDS': 0.05, 'QUEUE_SIZE': 100})
+class EventStreamTests(SoftDeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.issue = self.create_issues(self.project, 1)[0]
+        self.url = f'/api/v1/async/projects/{self.project.id}/events/'
+        self.headers = {'Authorization': f'JWT {AccessToken.for_user(self.author)}'}
+
+    def comment(self, count=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                Comment.objects.create(author=self.author, issue=self.issue, description=f'{i}')
+
+    async def read_events(self, response, count):
+        chunks = []
+        async for chunk in response.streaming_content:
+            chunks.append(chunk.decode())
+            events = parse_frames(chunks)
+            if len(events) >= count:
+                return events
+
+    async def stream_while(self, url, write, count, **headers):
+        response = await self.async_client.get(url, headers={**self.headers, **headers})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        reader = asyncio.ensure_future(self.read_events(response, count))
+        # Let the stream subscribe before writing.
+        await asyncio.sleep(0.1)
+        await sync_to_async(write)()
+        return await asyncio.wait_for(reader, timeout=5)
+
+    async def test_live_events(self):
+        events = await self.stream_while(self.url, self.comment, 2)
+        self.assertEqual([event['event'] for event in events],
+                         ['comment.create', 'issue.update'])
+        self.assertEqual(events[0]['data']['data']['description'], '0')
+        self.assertEqual(events[1]['data']['data']['comment_count'], 1)
+
+    async def test_resume_from_last_event_id(self):
+        await sync_to_async(self.comment)()
+        last_id = await sync_to_async(sync.head)()
+        await sync_to_async(self.comment)()
+        url = f'/api/v1/async/projects/{self.project.id}/issues/{self.issue.id}/events/'
+        events = await self.stream_while(url, lambda: None, 2, **{'Last-Event-ID': str(last_id)})
+        self.assertEqual([event['event'] for event in events],
+                         ['comment.create', 'issue.update'])
+        self.assertGreater(events[0]['id'], last_id)
+
+    async def test_slow_consumers_catch_up_from_the_log(self):
+        with self.settings(EVENTS={'HEARTBEAT_SECONDS': 0.05, 'QUEUE_SIZE': 1}):
+            events = await self.stream_while(self.url, lambda: self.comment(3), 6)
+        ids = [event['id'] for event in events]
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertEqual([event['event'] for event in events].count('comment.create'), 3)
+
+    async def test_busy_streams_end_when_the_contributor_is_removed(self):
+        member = await User.objects.acreate(username='member', age=30)
+        contributor = await Contributor.objects.acreate(
+            user=member, project=self.project, role='CONTRIBUTOR')
+        headers = {'Authorization': f'JWT {AccessToken.for_user(member)}'}
+
+        async def read_all(response):
+            return [chunk async for chunk in response.streaming_content]
+
+        with self.settings(EVENTS={'HEARTBEAT_SECONDS': 0.2}):
+            response = await self.async_client.get(self.url, headers=headers)
+            reader = asyncio.ensure_future(read_all(response))
+            await asyncio.sleep(0.1)
+            await sync_to_async(contributor.delete)()
+            # Events keep coming faster than the heartbeat.
+            for _ in range(40):
+                if reader.done():
+                    break
+                await sync_to_async(self.comment)()
+                await asyncio.sleep(0.05)
+            self.assertTrue(reader.done())
+            await reader
+
+    async def test_streams_require_membership(self):
+        outsider = await User.objects.acreate(username='outsider', age=30)
+        response = await self.async_client.get(
+            self.url, headers={'Authorization': f'JWT {AccessToken.for_user(outsider)}'})
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(
+            f'/api/v1/async/projects/{self.project.id}/issues/0/events/', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+
+class ActivityTests(SoftDeskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project = self.create_project()
+        self.url = f'/api/v1/projects/{self.project.id}/'
+
+    def post(self, path, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url + path, data, format='json')
+        self.assertIn(response.status_code, (200, 201))
+        return response
+
+    def test_writes_only_buffer_entries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.post('issues/', {'name': 'Bug', 'type': 'BUG', 'level': 'LOW',
+                                  'assigned_users': []})
+        self.assertFalse([query for query in queries
+                          if 'projects_activity' in query['sql']])
+        self.assertFalse(Activity.objects.exists())
+        self.assertEqual(activity_buffer.flush(), 3)
+        issue = Activity.objects.get(target_model='issue')
+        self.assertEqual((issue.verb, issue.actor_id, issue.actor_username, issue.target_name),
+                         ('create', self.author.id, 'author', 'Bug'))
+
+    @override_settings(ACTIVITY={'THREAD': False, 'BATCH_SIZE': 2})
+    def test_flush_on_batch_size(self):
+        activity_buffer.flush()
+        other = User.objects.create_user(username='other', password='password', age=30)
+        self.post('add_contributor/', {'user_id': other.id})
+        self.assertEqual(len(activity_buffer), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(self.url + 'remove_contributor/', {'user_id': other.id},
+                               format='json')
+        self.assertEqual(len(activity_buffer), 0)
+        self.assertEqual(list(Activity.objects.filter(target_model='contributor')
+                              .order_by('id').values_list('verb', 'target_name')),
+                         [('add', 'author'), ('add', 'other'), ('remove', 'other')])
+
+    def test_feed_is_paginated_newest_first(self):
+        self.post('issues/bulk/', [{'name': f'Issue {i}', 'type': 'BUG', 'level': 'LOW'}
+                                   for i in range(3)])
+        activity_buffer.flush()
+        response = self.client.get(self.url + 'activity/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['target_name'] for entry in response.data['results']],
+                         ['Issue 2', 'Issue 1'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([entry['target_model'] for entry in response.data['results']],
+                         ['issue', 'contributor'])
+
+        outsider = User.objects.create_user(username='outsider', password='password', age=30)
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(self.url + 'activity/').status_code, 403)
+
+
+class SchemaTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.schema_file = Path(directory.name) / 'openapi.json'
+        schema.schema_store.clear()
+        self.addCleanup(schema.schema_store.clear)
+
+    def docs_settings(self, **options):
+        return self.settings(API_DOCS={'SCHEMA_FILE': self.schema_file, 'UI': True, **options})
+
+    def test_prebuilt_schema_is_served_with_an_etag(self):
+        with self.docs_settings(LAZY_BUILD=False):
+            call_command('build_schema', stdout=StringIO())
+            with mock.patch.object(schema, 'build') as build:
+                response = self.client.get('/openapi.json')
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('/projects/', response.json()['paths'])
+                etag = response['ETag']
+                response = self.client.get('/openapi.json', HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                response = self.client.get('/swagger/', {'format': 'openapi'})
+                self.assertEqual(response['ETag'], etag)
+                response = self.client.get('/openapi.yaml')
+                self.assertEqual(response['Content-Type'], 'application/yaml')
+            build.assert_not_called()
+
+    def test_lazy_build_runs_once(self):
+        with self.docs_settings(LAZY_BUILD=True), \
+                mock.patch.object(schema, 'build', wraps=schema.build) as build:
+            first = self.client.get('/openapi.json')
+            second = self.client.get('/openapi.json')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(build.call_count, 1)
+        self.assertFalse(self.schema_file.exists())
+
+    def test_missing_schema_without_lazy_build(self):
+        with self.docs_settings(LAZY_BUILD=False):
+            self.assertEqual(self.client.get('/openapi.json').status_code, 503)
+
+
+class ProjectPurgeTests(SoftDeskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.member = User.objects.create_user(username='member', password='password', age=30)
+        Contributor.objects.create(user=self.member, project=self.project, role='CONTRIBUTOR')
+        self.issues = self.create_issues(self.project, 5)
+        self.issues[0].assigned_users.add(self.member)
+        Comment.objects.bulk_create([
+            Comment(author=self.author, issue=issue, description=f'Commentaire {i}')
+            for issue in self.issues for i in range(3)])
+        self.other = self.create_project('Autre')
+        self.create_issues(self.other, 2)
+        self.url = f'/api/v1/projects/{self.project.id}/'
+
+    def delete_project(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, 204)
+
+    def test_delete_hides_the_project_at_once(self):
+        since = sync.encode_token(sync.head())
+        membership_cache.get(self.member.pk)
+        with CaptureQueriesContext(connection) as queries:
+            self.delete_project()
+        self.assertLess(len(queries), 15)
+
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(Issue.objects.filter(project=self.project).count(), 5)
+        self.assertEqual(self.client.get(self.url + 'issues/').status_code, 403)
+        self.assertEqual(list(Project.alive.values_list('id', flat=True)), [self.other.id])
+        self.assertEqual(purge.pending(), [self.project.id])
+
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get('/api/v1/projects/').status_code, 404)
+        response = self.client.get('/api/v1/sync/', {'since': since})
+        self.assertEqual([(c['type'], c['action']) for c in response.json()['changes']],
+                         [('contributor', 'delete')])
+
+    def test_purge_deletes_leaf_first_in_chunks(self):
+        archive.move([self.issues[0].id])
+        self.delete_project()
+        steps = []
+        deleted = purge.purge_project(self.project.id, chunk_size=4,
+                                      progress=lambda step, count: steps.append(step))
+        self.assertEqual(deleted, {'comments': 12, 'assignments': 0, 'issues': 4,
+                                   'archived comments': 3, 'archived assignments': 1,
+                                   'archived issues': 1, 'contributors': 2, 'stats': 1,
+                                   'project': 1})
+        self.assertEqual(list(dict.fromkeys(steps)),
+                         [step for step, count in deleted.items() if count])
+        self.assertEqual(steps.count('comments'), 3)
+        self.assertFalse(Project.objects.filter(id=self.project.id).exists())
+        self.assertFalse(Comment.objects.filter(issue__project_id=self.project.id).exists())
+        self.assertEqual(Issue.objects.filter(project=self.other).count(), 2)
+        self.assertEqual(purge.pending(), [])
+
+    def test_interrupted_purge_resumes(self):
+        self.delete_project()
+        with mock.patch.object(purge, 'delete_rows', side_effect=[4, DatabaseError]):
+            with self.assertRaises(DatabaseError):
+                purge.purge_project(self.project.id, chunk_size=4)
+        self.assertEqual(Comment.objects.filter(issue__project_id=self.project.id).count(), 15)
+
+        purge.purge_project(self.project.id, chunk_size=4)
+        out = StringIO()
+        call_command('purge_projects', stdout=out)
+        self.assertIn('No project to purge', out.getvalue())
+        self.assertFalse(Project.objects.filter(id=self.project.id).exists())
+
+    def test_purge_skips_live_projects(self):
+        self.assertEqual(purge.purge_project(self.project.id), {})
+        self.assertTrue(Comment.objects.filter(issue__project_id=self.project.id).exists())
+
+
+class ArchiveTests(SoftDeskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.issues = self.create_issues(self.project, 6)
+        old = timezone.now() - timedelta(days=100)
+        Issue.objects.filter(id__in=[issue.id for issue in self.issues[:4]]).update(
+            status='Finished', last_activity_time=old)
+        Issue.objects.filter(id=self.issues[3].id).update(last_activity_time=timezone.now())
+        Issue.objects.filter(id=self.issues[4].id).update(last_activity_time=old)
+        self.old = self.issues[0]
+        self.old.assigned_users.add(self.author)
+        self.comments = Comment.objects.bulk_create([
+            Comment(author=self.author, issue=self.old, description=f'Commentaire {i}')
+            for i in range(3)])
+        stats.reconcile(self.project.id)
+        self.url = f'/api/v1/projects/{self.project.id}/issues/'
+
+    def test_archive_moves_old_finished_issues(self):
+        created_time = Issue.objects.get(id=self.old.id).created_time
+        batches = []
+        self.assertEqual(archive.archive(age_days=30, batch_size=2, progress=batches.append), 3)
+        self.assertEqual(batches, [2, 3])
+        self.assertEqual(set(ArchivedIssue.objects.values_list('id', flat=True)),
+                         {issue.id for issue in self.issues[:3]})
+        self.assertEqual(Issue.objects.filter(project=self.project).count(), 3)
+        archived = ArchivedIssue.objects.get(id=self.old.id)
+        self.assertEqual(archived.created_time, created_time)
+        self.assertEqual(list(archived.assigned_users.all()), [self.author])
+        self.assertEqual(sorted(archived.comment_set.values_list('id', flat=True)),
+                         [comment.id for comment in self.comments])
+        self.assertFalse(Comment.objects.filter(issue_id=self.old.id).exists())
+        self.assertEqual(stats.reconcile(self.project.id), [])
+        self.assertEqual(archive.archive(age_days=30), 0)
+
+    def test_list_reads_hot_tables_unless_asked(self):
+        archive.archive(age_days=30)
+        response = self.client.get(self.url, {'limit': 10})
+        self.assertEqual(response.json()['count'], 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'include_archived': 1, 'limit': 10,
+                                                  'ordering': '-created_time'})
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(queries), 12)
+        results = response.json()['results']
+        self.assertEqual([item['id'] for item in results],
+                         [issue.id for issue in reversed(self.issues)])
+        self.assertEqual([item['archived'] for item in results], [False] * 3 + [True] * 3)
+        self.assertEqual(results[-1]['assigned_users'], [self.author.id])
+        self.assertEqual(len(results[-1]['comments']), 3)
+
+        response = self.client.get(self.url, {'include_archived': 1, 'limit': 2, 'offset': 2})
+        self.assertEqual([item['id'] for item in response.json()['results']],
+                         [self.issues[2].id, self.issues[3].id])
+
+    def test_archived_issue_and_comments(self):
+        archive.archive(age_days=30)
+        url = f'{self.url}{self.old.id}/'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.get(url, {'include_archived': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['archived'])
+
+        self.assertEqual(self.client.get(url + 'comments/').status_code, 404)
+        response = self.client.get(url + 'comments/', {'include_archived': 1, 'limit': 10})
+        self.assertEqual(response.json()['count'], 3)
+        response = self.client.post(url + 'comments/?include_archived=1',
+                                    {'description': 'Nouveau'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_unarchive(self):
+        archive.archive(age_days=30)
+        url = f'{self.url}{self.old.id}/unarchive/'
+        member = User.objects.create_user(username='member', password='password', age=30)
+        Contributor.objects.create(user=member, project=self.project, role='CONTRIBUTOR')
+        self.client.force_authenticate(member)
+        self.assertEqual(self.client.post(url).status_code, 403)
+
+        self.client.force_authenticate(self.author)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['assigned_users'], [self.author.id])
+        self.assertEqual(Comment.objects.filter(issue_id=self.old.id).count(), 3)
+        self.assertFalse(ArchivedIssue.objects.filter(id=self.old.id).exists())
+        self.assertEqual(self.client.get(f'{self.url}{self.old.id}/').status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 404)
+
+    def test_restored_issues_are_not_archived_again(self):
+        archive.archive(age_days=30)
+        archive.restore([self.old.id])
+        issue = Issue.objects.get(id=self.old.id)
+        self.assertGreater(issue.last_activity_time, timezone.now() - timedelta(minutes=1))
+        self.assertGreater(issue.updated_time, timezone.now() - timedelta(minutes=1))
+        self.assertEqual(archive.archive(age_days=30), 0)
+        self.assertTrue(Issue.objects.filter(id=self.old.id).exists())
+
+    def test_moves_are_logged_for_delta_sync(self):
+        since = sync.encode_token(sync.head())
+        archive.archive(age_days=30)
+        response = self.client.get('/api/v1/sync/', {'since': since})
+        self.assertEqual(sorted((c['id'], c['action']) for c in response.json()['changes']),
+                         [(issue.id, 'delete') for issue in self.issues[:3]])
+
+        since = response.json()['next']
+        archive.restore([self.old.id])
+        changes = self.client.get('/api/v1/sync/', {'since': since}).json()['changes']
+        self.assertEqual([(c['id'], c['action']) for c in changes], [(self.old.id, 'upsert')])
+        self.assertEqual(changes[0]['data']['assigned_users'], [self.author.id])
+
+
+class MyWorkTests(SoftDeskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.projects = [self.create_project('Un'), self.create_project('Deux')]
+        self.issues = self.create_issues(self.projects[0], 3) + self.create_issues(self.projects[1], 2)
+        for issue in self.issues[:2] + self.issues[3:]:
+            issue.assigned_users.add(self.author)
+        now = timezone.now()
+        for i, issue in enumerate(self.issues):
+            Issue.objects.filter(id=issue.id).update(updated_time=now - timedelta(hours=i))
+        Issue.objects.filter(id=self.issues[1].id).update(status='Finished')
+
+        # Still assigned, but no longer a contributor of the project.
+        other = User.objects.create_user(username='other', password='password', age=30)
+        left = Project.objects.create(name='Autre', author=other, description='', type='iOS')
+        Contributor.objects.create(user=self.author, project=left, role='CONTRIBUTOR')
+        self.create_issues(left, 1)[0].assigned_users.add(self.author)
+        Contributor.objects.filter(user=self.author, project=left).delete()
+
+    def test_my_issues_across_projects(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/me/issues/')
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), 2)
+        results = response.json()['results']
+        self.assertEqual([item['id'] for item in results],
+                         [self.issues[i].id for i in (0, 1, 3, 4)])
+        self.assertEqual([item['project'] for item in results],
+                         [self.projects[0].id] * 2 + [self.projects[1].id] * 2)
+        self.assertEqual(results[0]['assigned_users'], [self.author.id])
+
+    def test_assignment_index_is_installed(self):
+        table = Issue.assigned_users.through._meta.db_table
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        self.assertEqual(constraints['assignment_user_issue_idx']['columns'],
+                         ['user_id', 'issue_id'])
+
+    def test_filters_and_keyset_pages(self):
+        response = self.client.get('/api/v1/me/issues/', {'status': 'Finished'})
+        self.assertEqual([item['id'] for item in response.json()['results']],
+                         [self.issues[1].id])
+        response = self.client.get('/api/v1/me/issues/', {'level': 'Urgent'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/api/v1/me/issues/', {'page_size': 3})
+        self.assertEqual(len(response.json()['results']), 3)
+        response = self.client.get(response.json()['next'])
+        self.assertEqual([item['id'] for item in response.json()['results']],
+                         [self.issues[4].id])
+
+    def test_deleted_projects_are_left_out(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/v1/projects/{self.projects[1].id}/')
+        response = self.client.get('/api/v1/me/issues/')
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_my_activity(self):
+        commenter = User.objects.create_user(username='commenter', password='password', age=30)
+        Comment.objects.create(author=commenter, issue=self.issues[0], description='Premier')
+        Comment.objects.create(author=self.author, issue=self.issues[2], description='Ignoré')
+        Comment.objects.create(author=self.author, issue=self.issues[3], description='Dernier')
+
+        response = self.client.get('/api/v1/me/activity/')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([item['description'] for item in results], ['Dernier', 'Premier'])
+        self.assertEqual(results[1]['author'], {'id': commenter.id, 'username': 'commenter'})
+        self.assertEqual(results[1]['project'], self.projects[0].id)
+        self.assertEqual(results[1]['issue'], self.issues[0].id)
+
+
+class LoadTestingTests(SoftDeskTestCase):
+
+    def test_benchmark_runs_on_a_seeded_dataset(self):
+        call_command('seed_softdesk', users=6, projects=3, issues=30, comments=90,
+                     huge_projects=1, huge_contributors=4, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'results.json'
+            comments = Comment.objects.count()
+            call_command('benchmark_softdesk', iterations=2, warmup=1, output=str(output),
+                         stdout=StringIO())
+            results = json.loads(output.read_text())
+        self.assertEqual(Comment.objects.count(), comments)
+        self.assertIn('issue-detail', results)
+        self.assertIn('comment-create', results)
+        self.assertTrue(all(result['queries'] > 0 for result in results.values()))
+
+
+class StartupTests(SimpleTestCase):
+    def test_startup_profile(self):
+        out = StringIO()
+        call_command('startup_profile', '--runs', '1', '--top', '3', '--anonymous', stdout=out)
+        self.assertIn('First response (401 Unauthorized for /api/v1/sync/)', out.getvalue())
+        self.assertIn('Slowest packages', out.getvalue())
+
+    def test_startup_budget(self):
+        with self.assertRaises(CommandError):
+            call_command('startup_profile', '--runs', '1', '--budget', '1', '--anonymous',
+                         stdout=StringIO())
+
+    def test_production_settings_skip_unused_apps(self):
+        # django.contrib.admin itself is imported by rest_framework.schemas.
+        script = ("import sys, django; django.setup(); import app.urls; "
+                  "print(' '.join(m for m in ('drf_yasg', 'django.contrib.auth.views') "
+                  "if m in sys.modules)); "
+                  "print(any(str(p.pattern) == 'admin/' for p in app.urls.urlpatterns))")
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'app.settings_production',
+               'DJANGO_SECRET_KEY': 'test'}
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True,
+                                text=True, env=env, check=True)
+        self.assertEqual(result.stdout.split('\n')[:2], ['', 'False'])
@@ -1,52 +1,100 @@
-from rest_framework import generics, viewsets, status
+from collections import Counter
+
+from rest_framework import filters, generics, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.generics import RetrieveUpdateDestroyAPIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, SAFE_METHODS
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Prefetch, Value, prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework.exceptions import NotFound
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+
+from . import activity, archive, purge, sync
+from .activity import ActivityMixin
+from .cache import CachedRetrieveMixin, response_cache
+from .conditional import ConditionalGetMixin
+from .export import export_project
+from .membership import is_contributor, membership_cache, to_pk
+from .metrics import SerializerTimingMixin, serializer_data
+from .pagination import (
+    ActivityCursorPagination, AssignedIssueCursorPagination, CursorOrOffsetPagination,
+    RecentCommentCursorPagination)
+from .replicas import ReplicaReadMixin
+from .search import search as search_project
+from .sparse import SparseFieldsMixin
+from .stats import apply as apply_stats, apply_issues, get_stats
+from .permissions import IsContributor, IsOwnerOrReadOnly
+from .serializers import (
+    ActivitySerializer, AssignedCommentSerializer, AssignedIssueSerializer, CommentSerializer,
+    IssueBulkSerializer, IssueCountSerializer, IssueSerializer, ProjectSerializer,
+    UserSerializer)
+from .models import (
+    Activity, ArchivedComment, ArchivedIssue, Change, Comment, Contributor, Issue, Project, User)
+
+
+def age_error(data):
+    age = int(data.get('age', 0))
+    can_data_be_shared = data.get('can_data_be_shared', False)
 
-from .permissions import *
-from .serializers import *
-from .models import *
+    if can_data_be_shared and age < 15:
+        return "Vous devez avoir au moins 15 ans pour pouvoir partager vos données."
+    return None
 
 
 def check_age(request):
-    age = int(request.data.get('age', 0))
-    can_data_be_shared = request.data.get('can_data_be_shared', False)
+    error = age_error(request.data)
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+    return None
 
-    if can_data_be_shared and age < 15:
+
+def check_bulk_payload(items):
+    if not isinstance(items, list):
+        return Response(
+            {"error": "Une liste d'éléments est attendue."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(items) > settings.BULK_MAX_ITEMS:
         return Response(
-            {"error": "Vous devez avoir au moins 15 ans pour pouvoir partager vos données."},
+            {"error": f"Un lot ne peut pas dépasser {settings.BULK_MAX_ITEMS} éléments."},
             status=status.HTTP_400_BAD_REQUEST
         )
     return None
 
 
-class UserRegistrationView(generics.CreateAPIView):
+def validate_bulk(serializer_class, items, context):
     """
-    API view for user registration.
+    Validate each item of a bulk payload.
+    Returns the validated data and a list of per-item errors (empty dicts for valid items).
     """
-    permission_classes = [AllowAny]
-    serializer_class = UserRegistrationSerializer
-
-    def create(self, request, *args, **kwargs):
-        if request.user.is_authenticated:
-            return Response({"error": "Vous êtes déjà inscrit."}, status=status.HTTP_400_BAD_REQUEST)
-
-        age_check_response = check_age(request)
-        if age_check_response:
-            return age_check_response
-
-        serializer = self.get_serializer(data=request.data)
+    validated, errors = [], []
+    for item in items:
+        serializer = serializer_class(data=item, context=context)
         if serializer.is_valid():
-            user = serializer.save()
-            return Response({"message": "Utilisateur enregistré avec succès."}, status=status.HTTP_201_CREATED)
+            validated.append(serializer.validated_data)
+            errors.append({})
+        else:
+            validated.append(None)
+            errors.append(serializer.errors)
+    return validated, errors
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def bulk_error_response(errors):
+    return Response(
+        {"results": [{"errors": item_errors} if item_errors else {}
+                     for item_errors in errors]},
+        status=status.HTTP_400_BAD_REQUEST
+    )
 
-class UserProfileView(RetrieveUpdateDestroyAPIView):
+
+class UserProfileView(SerializerTimingMixin, RetrieveUpdateDestroyAPIView):
     """
     API view for user to manage his profile.
     """
@@ -54,50 +102,185 @@ class UserProfileView(RetrieveUpdateDestroyAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
-    def get(self, request, *args, **kwargs):
+    def get_user(self):
         user = self.request.user
+        prefetch_related_objects([user], Prefetch(
+            'contributor_set',
+            queryset=Contributor.objects.filter(
+                project__deleted_time=None).select_related('project')))
+        return user
+
+    def get(self, request, *args, **kwargs):
+        user = self.get_user()
         serializer = self.get_serializer(user)
-        return Response(serializer.data)
+        return Response(serializer_data(serializer))
 
     def update(self, request, *args, **kwargs):
         age_check_response = check_age(request)
         if age_check_response:
             return age_check_response
 
-        user = self.request.user
+        user = self.get_user()
         serializer = UserSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            return Response(serializer_data(serializer))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class MyIssuesView(ReplicaReadMixin, SerializerTimingMixin, generics.ListAPIView):
+    """
+    API view listing the issues assigned to the user across their projects.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = AssignedIssueSerializer
+    pagination_class = AssignedIssueCursorPagination
+    filter_fields = {
+        'status': Issue.STATUS_CHOICES,
+        'level': Issue.LEVEL_CHOICES,
+        'type': Issue.TYPE_CHOICES,
+    }
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Issue.objects.none()
+        issues = Issue.objects.assigned_to(self.request.user.pk)
+        params = self.request.query_params
+        for name, choices in self.filter_fields.items():
+            if name in params:
+                if params[name] not in dict(choices):
+                    raise ValidationError({name: "Valeur invalide."})
+                issues = issues.filter(**{name: params[name]})
+        return issues.with_details(comment_ids=False)
+
+
+class MyActivityView(ReplicaReadMixin, SerializerTimingMixin, generics.ListAPIView):
+    """
+    API view listing the recent comments on the issues assigned to the user.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = AssignedCommentSerializer
+    pagination_class = RecentCommentCursorPagination
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Comment.objects.none()
+        issue_ids = Issue.objects.assigned_to(self.request.user.pk).values('id')
+        return (Comment.objects.filter(issue_id__in=issue_ids)
+                .annotate(project_id=F('issue__project_id'),
+                          author_username=F('author__username')))
+
+
+class CacheStatsView(APIView):
+    """
+    API view exposing the response cache hit/miss counters of this process.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(response_cache.get_stats())
+
+
+class ProjectViewSet(
+    ActivityMixin,
+    ReplicaReadMixin,
+    SparseFieldsMixin,
+    ConditionalGetMixin,
+    CachedRetrieveMixin,
+    SerializerTimingMixin,
+    viewsets.ModelViewSet
+):
     """
     API view for managing projects.
     """
     serializer_class = ProjectSerializer
+    pagination_class = CursorOrOffsetPagination
     permission_classes = [IsOwnerOrReadOnly]
+    cache_resource = 'project'
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Project.alive.none()
         user = self.request.user
-        projects = Project.objects.filter(contributor__user=user)
+        projects = Project.alive.filter(contributor__user_id=user.pk).with_details()
 
         if not projects.exists():
             raise NotFound("Aucun projet trouvé pour cet utilisateur.")
 
         return projects
 
+    def check_membership(self, project_id):
+        if not is_contributor(self.request.user, project_id):
+            if not Project.alive.filter(id=to_pk(project_id)).exists():
+                raise NotFound("Projet non trouvé.")
+            raise PermissionDenied(
+                "Vous n'êtes pas contributeur de ce projet.")
+
+    def check_cached_access(self):
+        self.check_membership(self.kwargs.get('pk'))
+
+    def get_detail_validator(self):
+        project_id = self.kwargs.get('pk')
+        self.check_membership(project_id)
+        last_modified = Project.alive.filter(id=project_id).values_list(
+            'updated_time', flat=True).first()
+        return (last_modified, 1) if last_modified else None
+
     def get_object(self):
         project_id = self.kwargs.get('pk')
+        self.check_membership(project_id)
+        projects = Project.alive.all()
+        if self.action in ('retrieve', 'update', 'partial_update'):
+            projects = projects.with_details()
         try:
-            project = Project.objects.get(id=project_id)
+            return projects.get(id=project_id)
         except Project.DoesNotExist:
             raise NotFound("Projet non trouvé.")
-        if not Contributor.objects.filter(project=project, user=self.request.user).exists():
-            raise PermissionDenied(
-                "Vous n'êtes pas contributeur de ce projet.")
-        return project
+
+    def perform_destroy(self, instance):
+        # The deletion collector would load every issue and comment:
+        # hide the project now and purge it in the background.
+        purge.soft_delete(instance)
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        project = self.get_object()
+        response = StreamingHttpResponse(
+            export_project(project), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="project-{project.id}.ndjson"'
+        return response
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        self.check_membership(pk)
+        return Response(get_stats(to_pk(pk)))
+
+    @action(detail=True, methods=['get'])
+    def search(self, request, pk=None):
+        self.check_membership(pk)
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {"error": "Le paramètre de recherche q est requis."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        paginator = LimitOffsetPagination()
+        paginator.max_limit = settings.MAX_PAGE_SIZE
+        paginator.request = request
+        paginator.limit = paginator.get_limit(request)
+        paginator.offset = paginator.get_offset(request)
+        paginator.count, results = search_project(
+            to_pk(pk), query, paginator.limit, paginator.offset)
+        return paginator.get_paginated_response(results)
+
+    @action(detail=True, methods=['get'])
+    def activity(self, request, pk=None):
+        self.check_membership(pk)
+        paginator = ActivityCursorPagination()
+        page = paginator.paginate_queryset(
+            Activity.objects.filter(project_id=to_pk(pk)), request, self)
+        return paginator.get_paginated_response(ActivitySerializer(page, many=True).data)
 
     @action(detail=True, methods=['post'])
     def add_contributor(self, request, pk=None):
@@ -126,6 +309,53 @@ class ProjectViewSet(viewsets.ModelViewSet):
             "message": f"{user.username} a été ajouté comme contributeur du projet {project.name}."
         })
 
+    @action(detail=True, methods=['post'], url_path='contributors/bulk')
+    def bulk_add_contributors(self, request, pk=None):
+        project = self.get_object()
+        user_ids = request.data.get('user_ids')
+        error_response = check_bulk_payload(user_ids)
+        if error_response:
+            return error_response
+
+        user_ids = [to_pk(user_id) for user_id in user_ids]
+        existing_users = dict(User.objects.filter(
+            id__in=user_ids).values_list('id', 'username'))
+        existing_contributors = set(Contributor.objects.filter(
+            project=project, user_id__in=user_ids).values_list('user_id', flat=True))
+
+        results, seen = [], set()
+        for user_id in user_ids:
+            if user_id not in existing_users:
+                results.append({"user_id": user_id, "error": "Utilisateur non trouvé."})
+            elif user_id in existing_contributors or user_id in seen:
+                results.append({"user_id": user_id,
+                                "error": "L'utilisateur est déjà un contributeur."})
+            else:
+                results.append({"user_id": user_id})
+            seen.add(user_id)
+
+        if any('error' in result for result in results):
+            return Response({"results": results}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            contributors = Contributor.objects.bulk_create([
+                Contributor(user_id=user_id, project=project, role='CONTRIBUTOR')
+                for user_id in user_ids
+            ])
+            sync.record(*(sync.entry('contributor', contributor.id, project.id, Change.CREATE,
+                                     user_id=contributor.user_id)
+                          for contributor in contributors))
+            activity.record(*(activity.entry(project.id, 'add', 'contributor', user_id,
+                                             existing_users[user_id])
+                              for user_id in user_ids))
+        # bulk_create does not send post_save, so do the signal handlers' work here.
+        for user_id in user_ids:
+            membership_cache.invalidate(user_id)
+        Project.objects.filter(id=project.id).touch()
+        response_cache.bump('project', project.id)
+
+        return Response({"results": results}, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['delete'])
     def remove_contributor(self, request, pk=None):
         project = self.get_object()
@@ -156,34 +386,283 @@ class ProjectViewSet(viewsets.ModelViewSet):
         })
 
 
-class IssueViewSet(viewsets.ModelViewSet):
+class IssueViewSet(
+    ActivityMixin,
+    ReplicaReadMixin,
+    SparseFieldsMixin,
+    ConditionalGetMixin,
+    CachedRetrieveMixin,
+    SerializerTimingMixin,
+    viewsets.ModelViewSet
+):
     """
     API view for managing issues within projects.
     """
     serializer_class = IssueSerializer
+    pagination_class = CursorOrOffsetPagination
     permission_classes = [IsOwnerOrReadOnly,
                           IsContributor]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['created_time', 'last_activity_time', 'comment_count']
+    cache_resource = 'issue'
+
+    def comments_as_count(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return False
+        return (self.request.method in SAFE_METHODS and
+                self.request.query_params.get('comments') == 'count')
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'retrieve') and self.comments_as_count():
+            return IssueCountSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Issue.objects.none()
         project_id = self.kwargs.get('project_pk')
-        issue = Issue.objects.filter(project_id=project_id)
+        issue = Issue.objects.filter(project_id=project_id).with_details(
+            comment_ids=not self.comments_as_count())
         if not issue.exists():
             raise NotFound("Aucun problème trouvé pour ce projet.")
         return issue
 
+    def filter_queryset(self, queryset):
+        return self.filter_issues(super().filter_queryset(queryset))
+
+    def filter_issues(self, queryset):
+        params = self.request.query_params
+        if 'min_comments' in params:
+            min_comments = to_pk(params['min_comments'])
+            if min_comments is None:
+                raise ValidationError({"min_comments": "Un nombre entier est attendu."})
+            queryset = queryset.filter(comment_count__gte=min_comments)
+        if 'active_since' in params:
+            active_since = parse_datetime(params['active_since'])
+            if active_since is None:
+                raise ValidationError({"active_since": "Une date ISO 8601 est attendue."})
+            queryset = queryset.filter(last_activity_time__gte=active_since)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if archive.include_archived(request):
+            return self.list_with_archived(request)
+        return super().list(request, *args, **kwargs)
+
+    def list_with_archived(self, request):
+        """
+        Hot and archived issues, paginated with limit/offset over the union
+        of their ids, then read from their own tables page by page.
+        """
+        project_id = self.kwargs.get('project_pk')
+        ordering = filters.OrderingFilter().get_ordering(
+            request, Issue.objects.none(), self) or ['created_time']
+        columns = sorted({name.lstrip('-') for name in ordering} | {'id'})
+        hot, archived = (
+            self.filter_issues(model.objects.filter(project_id=project_id))
+            .values(*columns).annotate(archived=Value(model is ArchivedIssue))
+            for model in (Issue, ArchivedIssue))
+        rows = hot.union(archived, all=True).order_by(*ordering, 'id')
+
+        paginator = LimitOffsetPagination()
+        paginator.max_limit = settings.MAX_PAGE_SIZE
+        page = paginator.paginate_queryset(rows, request, self)
+        if not paginator.count:
+            raise NotFound("Aucun problème trouvé pour ce projet.")
 
-class CommentViewSet(viewsets.ModelViewSet):
+        objects = {}
+        for model in (Issue, ArchivedIssue):
+            archived = model is ArchivedIssue
+            ids = [row['id'] for row in page if bool(row['archived']) == archived]
+            if ids:
+                objects.update(((model, obj.id), obj) for obj in model.objects.filter(
+                    id__in=ids).with_details(comment_ids=not self.comments_as_count()))
+        issues = [objects[(ArchivedIssue if row['archived'] else Issue, row['id'])]
+                  for row in page]
+        data = serializer_data(self.get_serializer(issues, many=True))
+        for item, issue in zip(data, issues):
+            item['archived'] = isinstance(issue, ArchivedIssue)
+        return paginator.get_paginated_response(data)
+
+    def get_archived_issue(self):
+        return (ArchivedIssue.objects
+                .filter(project_id=self.kwargs.get('project_pk'), id=to_pk(self.kwargs.get('pk')))
+                .with_details(comment_ids=not self.comments_as_count()).first())
+
+    def retrieve(self, request, *args, **kwargs):
+        if archive.include_archived(request):
+            issue = self.get_archived_issue()
+            if issue is not None:
+                return Response({**serializer_data(self.get_serializer(issue)), 'archived': True})
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=True, methods=['post'])
+    def unarchive(self, request, project_pk=None, pk=None):
+        issue = self.get_archived_issue()
+        if issue is None:
+            raise NotFound("Problème archivé non trouvé.")
+        self.check_object_permissions(request, issue)
+        archive.restore([issue.id])
+        issue = Issue.objects.with_details().get(id=issue.id)
+        return Response(serializer_data(self.get_serializer(issue)))
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, project_pk=None):
+        error_response = check_bulk_payload(request.data)
+        if error_response:
+            return error_response
+
+        validated, errors = validate_bulk(
+            IssueBulkSerializer, request.data, self.get_serializer_context())
+
+        assigned_ids = {user_id for data in validated if data
+                        for user_id in data['assigned_users']}
+        contributor_ids = set(Contributor.objects.filter(
+            project_id=project_pk, user_id__in=assigned_ids
+        ).values_list('user_id', flat=True))
+        for data, item_errors in zip(validated, errors):
+            if not data:
+                continue
+            for user_id in data['assigned_users']:
+                if user_id not in contributor_ids:
+                    item_errors['assigned_users'] = [
+                        f"L'utilisateur avec l'ID {user_id} n'est pas un contributeur de ce projet."]
+                    break
+
+        if any(errors):
+            return bulk_error_response(errors)
+
+        with transaction.atomic():
+            issues = Issue.objects.bulk_create([
+                Issue(project_id=project_pk, **{key: value for key, value in data.items()
+                                                if key != 'assigned_users'})
+                for data in validated
+            ])
+            Assignment = Issue.assigned_users.through
+            Assignment.objects.bulk_create([
+                Assignment(issue_id=issue.id, user_id=user_id)
+                for issue, data in zip(issues, validated)
+                for user_id in set(data['assigned_users'])
+            ])
+            Project.objects.filter(id=project_pk).touch()
+            # bulk_create sends no signals: update the counters here.
+            apply_issues([(issue.project_id, issue.status, issue.level, issue.type)
+                          for issue in issues])
+            apply_stats(to_pk(project_pk), Counter(
+                ('assignee', str(user_id))
+                for data in validated for user_id in set(data['assigned_users'])))
+            sync.record(*(sync.entry('issue', issue.id, issue.project_id, Change.CREATE)
+                          for issue in issues))
+            activity.record(*(activity.entry(issue.project_id, 'create', 'issue',
+                                             issue.id, issue.name)
+                              for issue in issues))
+        response_cache.bump('project', project_pk)
+
+        return Response({"results": [{"id": issue.id} for issue in issues]},
+                        status=status.HTTP_201_CREATED)
+
+
+class CommentViewSet(
+    ActivityMixin,
+    ReplicaReadMixin,
+    SparseFieldsMixin,
+    ConditionalGetMixin,
+    SerializerTimingMixin,
+    viewsets.ModelViewSet
+):
     """
     API view for managing comments on issues.
     """
     serializer_class = CommentSerializer
+    pagination_class = CursorOrOffsetPagination
     permission_classes = [IsOwnerOrReadOnly, IsContributor]
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Comment.objects.none()
         project_id = self.kwargs.get('project_pk')
         issue_id = self.kwargs.get('issue_pk')
-        issue = get_object_or_404(Issue, id=issue_id, project_id=project_id)
-        comments = Comment.objects.filter(issue=issue)
+        if (archive.include_archived(self.request) and
+                not Issue.objects.filter(id=issue_id, project_id=project_id).exists()):
+            # Comments of an archived issue, read-only.
+            issue = get_object_or_404(ArchivedIssue, id=issue_id, project_id=project_id)
+            comments = ArchivedComment.objects.filter(issue=issue)
+        else:
+            issue = get_object_or_404(Issue, id=issue_id, project_id=project_id)
+            comments = Comment.objects.filter(issue=issue)
         if not comments.exists():
             raise NotFound("Aucun commentaire trouvé pour ce problème.")
         return comments
+
+    def perform_create(self, serializer):
+        # Archived issues take no comments: unarchive them first.
+        get_object_or_404(Issue, id=self.kwargs.get('issue_pk'),
+                          project_id=self.kwargs.get('project_pk'))
+        serializer.save()
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, project_pk=None, issue_pk=None):
+        issue = get_object_or_404(Issue, id=issue_pk, project_id=project_pk)
+        error_response = check_bulk_payload(request.data)
+        if error_response:
+            return error_response
+
+        validated, errors = validate_bulk(
+            CommentSerializer, request.data, self.get_serializer_context())
+        if any(errors):
+            return bulk_error_response(errors)
+
+        with transaction.atomic():
+            comments = Comment.objects.bulk_create([
+                Comment(issue=issue, **data) for data in validated
+            ])
+            Issue.objects.filter(id=issue.id).touch(
+                comment_count=F('comment_count') + len(comments),
+                last_activity_time=timezone.now())
+            Project.objects.filter(id=issue.project_id).touch()
+            apply_stats(issue.project_id, {('comments', ''): len(comments)})
+            sync.record(*(sync.entry('comment', comment.id, issue.project_id, Change.CREATE,
+                                     issue_id=issue.id)
+                          for comment in comments),
+                        sync.entry('issue', issue.id, issue.project_id))
+            activity.record(*(activity.entry(issue.project_id, 'create', 'comment',
+                                             comment.id, comment.description[:100])
+                              for comment in comments))
+        response_cache.bump('issue', issue.id)
+        response_cache.bump('project', issue.project_id)
+
+        return Response({"results": [{"id": comment.id} for comment in comments]},
+                        status=status.HTTP_201_CREATED)
+
+
+class SyncView(ReplicaReadMixin, APIView):
+    """
+    API view returning the changes visible to the user since a sync token.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        if 'since' not in params:
+            # Starting point for a client about to download its projects.
+            return Response({"changes": [], "next": sync.encode_token(sync.head()),
+                             "has_more": False})
+
+        since = sync.decode_token(params['since'])
+        if since is None:
+            raise ValidationError({"since": "Jeton de synchronisation invalide."})
+        limit = None
+        if 'limit' in params:
+            limit = to_pk(params['limit'])
+            if limit is None or limit < 1:
+                raise ValidationError({"limit": "Un nombre entier positif est attendu."})
+
+        try:
+            changes, next_since, has_more = sync.changes_since(request.user, since, limit)
+        except sync.ExpiredToken:
+            return Response(
+                {"error": "Ce jeton a expiré, une synchronisation complète est nécessaire."},
+                status=status.HTTP_410_GONE
+            )
+        return Response({"changes": changes, "next": sync.encode_token(next_since),
+                         "has_more": has_more})